@@ -30,6 +30,10 @@ mkdir -p "$HOME/.local/share/monitor-control"
 # Копируем файлы приложения
 echo "📋 Копируем файлы приложения..."
 cp "$SCRIPT_DIR/monitor_control.py" "$APP_DIR/"
+cp "$SCRIPT_DIR/monitor_ipc.py" "$APP_DIR/"
+cp "$SCRIPT_DIR/monitor_cli.py" "$APP_DIR/"
+cp "$SCRIPT_DIR/monitor_i2c.py" "$APP_DIR/"
+cp "$SCRIPT_DIR/monitor_sim.py" "$APP_DIR/"
 cp "$SCRIPT_DIR/requirements.txt" "$APP_DIR/"
 cp "$SCRIPT_DIR/icon.png" "$APP_DIR/"
 cp "$SCRIPT_DIR/README.md" "$APP_DIR/" 2>/dev/null || true
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Monitor Control - замеры производительности на имитированных мониторах.
+
+    python3 monitor_bench.py                                   # два монитора по умолчанию
+    python3 monitor_bench.py --simulate monitors.json --animations 40
+    python3 monitor_bench.py --simulate ~/.monitor_control_trace.json   # воспроизвести трассу с железа
+    python3 monitor_bench.py --output after.json --compare before.json
+    python3 monitor_bench.py --transports                      # транспорты DDC/CI на настоящих мониторах
+
+Приложение запускается целиком (движок DDC, трей, меню, опрос) без дисплея и
+без настоящих шин I2C - на мониторах monitor_sim. Настройки и кэши пишутся во
+временный каталог, работающий экземпляр и его файлы не затрагиваются.
+
+Замеряется:
+    startup     - время до показа трея и до подключения всех мониторов
+    animation   - отклонение длительности анимации от TARGET_ANIMATION_DURATION_MS и записей на анимацию
+    refresh     - транзакций DDC на обновление: опрос с шины, опрос при открытии меню, "Обновить мониторы"
+    gui         - задержки потока GUI: опоздание таймера-пульса и время обработчиков сигналов
+
+С --transports вместо этого на настоящих мониторах сравнивается задержка одной
+транзакции (чтение и запись яркости) через monitorcontrol и прямой /dev/i2c-N.
+Записывается то же значение яркости, что было прочитано, - яркость не меняется.
+
+Результат сохраняется в JSON (--output), чтобы сравнивать замеры между коммитами (--compare).
+"""
+
+import time
+BENCH_STARTED_AT = time.perf_counter()  # Время до трея считаем от запуска процесса, включая импорт PyQt6
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+import monitor_sim
+
+DEFAULT_SIMULATE = "2"
+DEFAULT_ANIMATIONS = 20
+DEFAULT_REFRESHES = 5
+HEARTBEAT_INTERVAL_MS = 5     # Интервал таймера-пульса потока GUI
+WAIT_TIMEOUT_MS = 30000       # Сколько ждать завершения одного шага
+ANIMATION_PAUSE_MS = 300      # Пауза между анимациями (опрос и запись настроек успевают отработать)
+ANIMATION_TARGETS = (10, 90, 40, 60, 0, 100, 55, 45)  # Большие и маленькие изменения яркости
+DEFAULT_TRANSPORT_SAMPLES = 20
+TRANSPORT_IDLE_MS = 60        # Пауза перед каждой транзакцией: оба транспорта начинают с свободной шины
+
+def parse_args(argv):
+    """Разбирает параметры замера"""
+    parser = argparse.ArgumentParser(description="Monitor Control - замеры на имитированных мониторах")
+    parser.add_argument("--simulate", default=monitor_sim.get_spec() or DEFAULT_SIMULATE, metavar="N|FILE",
+                        help="число мониторов, конфигурация monitor_sim или трасса задержек (--record-trace)")
+    parser.add_argument("--animations", type=int, default=DEFAULT_ANIMATIONS, help="сколько анимаций яркости выполнить")
+    parser.add_argument("--refreshes", type=int, default=DEFAULT_REFRESHES, help="сколько раз повторить каждое обновление")
+    parser.add_argument("--transports", action="store_true", help="сравнить транспорты DDC/CI на настоящих мониторах")
+    parser.add_argument("--samples", type=int, default=DEFAULT_TRANSPORT_SAMPLES, help="транзакций каждого вида на транспорт")
+    parser.add_argument("--output", "-o", help="сохранить результат в JSON")
+    parser.add_argument("--compare", help="сравнить с результатом предыдущего замера (JSON)")
+    parser.add_argument("--log-level", default="WARNING", type=str.upper, help="уровень журнала приложения")
+    args = parser.parse_args(argv)
+    # Пути разрешаем до подмены HOME
+    if not args.simulate.strip().isdigit():
+        args.simulate = os.path.abspath(os.path.expanduser(args.simulate))
+    for name in ("output", "compare"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(os.path.expanduser(getattr(args, name))))
+    return args
+
+def isolate_environment():
+    """Без дисплея, с временными HOME (настройки, кэши, статистика) и каталогом сокета API"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    workdir = tempfile.mkdtemp(prefix="monitor-bench-")
+    os.environ["HOME"] = workdir
+    os.environ["XDG_RUNTIME_DIR"] = workdir
+    return workdir
+
+def percentiles(samples):
+    """p50, p99 и максимум выборки"""
+    if not samples:
+        return {"count": 0, "p50_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(samples)
+    def percentile(p):
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))], 3)
+    return {"count": len(ordered), "p50_ms": percentile(50), "p99_ms": percentile(99), "max_ms": round(ordered[-1], 3)}
+
+def git_revision():
+    """Коммит, на котором сделан замер (None вне git)"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+class Benchmark:
+    """Запуск приложения на имитированных мониторах и сбор метрик"""
+
+    def __init__(self, args):
+        self.args = args
+        self.results = {}
+        self.gui_lags = []
+        self.slot_timings = {}
+
+    def run(self):
+        import monitor_control as app_module
+        from PyQt6.QtWidgets import QApplication
+
+        self.app_module = app_module
+        import_ms = (time.perf_counter() - BENCH_STARTED_AT) * 1000
+
+        app_module.setup_logging(self.args.log_level)
+        os.environ[monitor_sim.SIMULATE_ENV] = self.args.simulate
+        self.vcps = None
+
+        # Обработчики сигналов потока GUI оборачиваем замером до того, как движок их подключит
+        for name in ("update_brightness_display", "update_tray_icon_brightness", "apply_monitor_state",
+                     "on_monitor_polled", "apply_monitor_scan"):
+            setattr(app_module, name, self._timed_slot(name, getattr(app_module, name)))
+
+        self.qt_app = QApplication(sys.argv[:1])
+        self.qt_app.setQuitOnLastWindowClosed(False)
+        app_module.start_engine(self.qt_app)
+        app_module.create_tray(self.qt_app)
+        time_to_tray_ms = (time.perf_counter() - BENCH_STARTED_AT) * 1000
+
+        self._start_heartbeat()
+        expected = len(monitor_sim.load_config(self.args.simulate).get("monitors", []))
+        self._wait(lambda: len(app_module.g_monitors) >= expected and not app_module.g_rescan_running, "сканирование")
+        time_to_monitors_ms = (time.perf_counter() - BENCH_STARTED_AT) * 1000
+        self.vcps = [entry["monitor"].vcp for entry in app_module.g_monitors.values()]
+
+        self.results["startup"] = {
+            "import_ms": round(import_ms, 1),
+            "time_to_tray_ms": round(time_to_tray_ms, 1),
+            "time_to_monitors_ms": round(time_to_monitors_ms, 1),
+            "monitors": len(app_module.g_monitors),
+        }
+        # Начальный опрос и чтение возможностей не должны попасть в замеры обновлений,
+        # фоновый опрос по таймеру - в число транзакций анимаций и обновлений
+        self._wait_idle()
+        app_module.poll_scheduler_global.set_screen_locked(True)
+
+        self.results["animation"] = self._bench_animations()
+        self.results["refresh"] = self._bench_refreshes()
+        self.results["gui"] = {
+            "heartbeat_lag": percentiles(self.gui_lags),
+            "slots": {name: percentiles(samples) for name, samples in sorted(self.slot_timings.items())},
+        }
+
+        app_module.ddc_engine_global.shutdown()
+        return {
+            "generated_at": time.time(),
+            "revision": git_revision(),
+            "simulate": self.args.simulate,
+            "target_animation_ms": app_module.TARGET_ANIMATION_DURATION_MS,
+            "metrics": self.results,
+        }
+
+    def _timed_slot(self, name, func):
+        """Обработчик сигнала с замером времени, на которое он занимает поток GUI"""
+        samples = self.slot_timings.setdefault(name, [])
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                samples.append((time.perf_counter() - start) * 1000)
+        wrapper.__name__ = func.__name__
+        return wrapper
+
+    def _start_heartbeat(self):
+        """Таймер потока GUI: опоздание каждого срабатывания - время, когда цикл событий был занят"""
+        from PyQt6.QtCore import QTimer, Qt
+
+        self.heartbeat_last = time.perf_counter()
+        def beat():
+            now = time.perf_counter()
+            self.gui_lags.append(max(0.0, (now - self.heartbeat_last) * 1000 - HEARTBEAT_INTERVAL_MS))
+            self.heartbeat_last = now
+        self.heartbeat = QTimer()
+        self.heartbeat.setTimerType(Qt.TimerType.PreciseTimer)
+        self.heartbeat.timeout.connect(beat)
+        self.heartbeat.start(HEARTBEAT_INTERVAL_MS)
+
+    def _wait(self, predicate, what, timeout_ms=WAIT_TIMEOUT_MS):
+        """Крутит цикл событий Qt, пока predicate() не станет истинным"""
+        deadline = time.perf_counter() + timeout_ms / 1000.0
+        while not predicate():
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"не дождались: {what}")
+            self.qt_app.processEvents()
+            time.sleep(0.001)
+
+    def _sleep(self, duration_ms):
+        """Пауза с работающим циклом событий"""
+        deadline = time.perf_counter() + duration_ms / 1000.0
+        self._wait(lambda: time.perf_counter() >= deadline, "пауза", duration_ms + 1000)
+
+    def _wait_idle(self):
+        """Ждет, пока у всех мониторов опустеют очереди задач DDC"""
+        workers = list(self.app_module.ddc_engine_global.workers.values())
+        self._wait(lambda: not any(worker.pending for worker in workers), "очереди DDC")
+        self._sleep(ANIMATION_PAUSE_MS)
+
+    def _bus_transactions(self):
+        """Транзакции шины всех имитированных мониторов (без открытий устройства)"""
+        return sum(vcp.transactions["get"] + vcp.transactions["set"] + vcp.transactions["capabilities"] for vcp in self.vcps)
+
+    def _animation_counts(self):
+        profiles = [worker.profile for worker in self.app_module.ddc_engine_global.workers.values()]
+        return sum(profile.animations["brightness"].durations.count for profile in profiles if "brightness" in profile.animations)
+
+    def _bench_animations(self):
+        """Анимации яркости всех мониторов: длительность против цели и записи на шину"""
+        app_module = self.app_module
+        monitors = len(self.vcps)
+        sets_before = sum(vcp.transactions["set"] for vcp in self.vcps)
+        transactions_before = self._bus_transactions()
+        completed = self._animation_counts()
+
+        for i in range(self.args.animations):
+            app_module.set_all_monitors_brightness(ANIMATION_TARGETS[i % len(ANIMATION_TARGETS)])
+            completed += monitors
+            self._wait(lambda: self._animation_counts() >= completed, "анимация")
+            self._sleep(ANIMATION_PAUSE_MS)
+
+        animations = max(1, self.args.animations * monitors)
+        durations = []
+        writes = []
+        for worker in app_module.ddc_engine_global.workers.values():
+            stats = worker.profile.animations.get("brightness")
+            if stats:
+                durations.extend(list(stats.durations.samples)[-self.args.animations:])
+                writes.extend(list(stats.writes)[-self.args.animations:])
+        errors = [abs(duration - app_module.TARGET_ANIMATION_DURATION_MS) for duration in durations]
+        return {
+            "duration": percentiles(durations),
+            "error_mean_ms": round(sum(errors) / len(errors), 1) if errors else None,
+            "error": percentiles(errors),
+            "within_tolerance": round(sum(error <= app_module.ANIMATION_TOLERANCE_MS for error in errors) / len(errors), 3) if errors else None,
+            "writes_per_animation": round(sum(writes) / len(writes), 1) if writes else None,
+            "bus_writes_per_animation": round((sum(vcp.transactions["set"] for vcp in self.vcps) - sets_before) / animations, 1),
+            "bus_transactions_per_animation": round((self._bus_transactions() - transactions_before) / animations, 1),
+        }
+
+    def _measure(self, start, wait, what):
+        """Транзакций шины на монитор за одно обновление: start() запускает, wait() - признак завершения"""
+        counts = []
+        for _ in range(self.args.refreshes):
+            before = self._bus_transactions()
+            done = start()
+            self._wait(lambda: wait(done), what)
+            self._wait_idle()
+            counts.append((self._bus_transactions() - before) / len(self.vcps))
+        return round(sum(counts) / len(counts), 2)
+
+    def _wait_polled(self):
+        """Ожидание свежего чтения всех мониторов (результата сигнала monitor_polled)"""
+        app_module = self.app_module
+        polled = set()
+        for monitor_key in app_module.g_monitors:
+            app_module.g_state_waiters.setdefault(monitor_key, []).append(polled.add)
+        return polled
+
+    def _bench_refreshes(self):
+        """Транзакций DDC на одно обновление состояния мониторов"""
+        app_module = self.app_module
+        keys = list(app_module.g_monitors)
+
+        def cold_poll():
+            polled = self._wait_polled()
+            for monitor_key in keys:
+                app_module.ddc_engine_global.request_state(monitor_key, app_module.g_monitors[monitor_key]["index"], max_age_ms=0)
+            return polled
+
+        def menu_open():
+            # Открытие меню: перечитываются только устаревшие состояния (как в приложении)
+            polled = set(keys)
+            app_module.update_brightness_display()
+            return polled
+
+        def rescan():
+            polled = self._wait_polled()
+            app_module.refresh_monitors(app_module.tray_icon_global, reread_capabilities=True)
+            return polled
+
+        return {
+            "poll_from_bus": self._measure(cold_poll, lambda polled: len(polled) == len(keys), "опрос"),
+            "menu_open": self._measure(menu_open, lambda polled: True, "открытие меню"),
+            "rescan": self._measure(rescan, lambda polled: len(polled) == len(keys) and not app_module.g_rescan_running,
+                                    "пересканирование"),
+        }
+
+def bench_transports(samples):
+    """Задержка транзакции каждого транспорта на каждой шине с монитором: p50/p99 чтения и записи яркости"""
+    import monitorcontrol.vcp
+    import monitor_i2c
+
+    results = {}
+    for default_vcp in monitorcontrol.vcp.get_vcps():
+        bus_number = default_vcp.bus_number
+        results[f"i2c-{bus_number}"] = bus_results = {}
+        for name, vcp in (("monitorcontrol", default_vcp), ("i2c-dev", monitor_i2c.I2CDevVCP(bus_number))):
+            timings = {"get": [], "set": []}
+            errors = {"get": 0, "set": 0}
+            try:
+                with vcp:
+                    for _ in range(samples):
+                        value = None
+                        for operation in ("get", "set"):
+                            time.sleep(TRANSPORT_IDLE_MS / 1000.0)
+                            start = time.perf_counter()
+                            try:
+                                if operation == "get":
+                                    value, _ = vcp.get_vcp_feature(monitor_sim.VCP_BRIGHTNESS)
+                                elif value is not None:
+                                    vcp.set_vcp_feature(monitor_sim.VCP_BRIGHTNESS, value)
+                                else:
+                                    continue
+                            except Exception:
+                                errors[operation] += 1
+                                continue
+                            timings[operation].append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                print(f"⚠️  i2c-{bus_number}, {name}: {e}", file=sys.stderr)
+            bus_results[name] = {operation: dict(percentiles(timings[operation]), errors=errors[operation]) for operation in timings}
+    return results
+
+def flatten(metrics, prefix=""):
+    """Плоский словарь числовых метрик: "animation.error.p99_ms" -> значение"""
+    flat = {}
+    for key, value in metrics.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def print_results(result, previous=None):
+    """Выводит метрики и, если есть, изменение относительно предыдущего замера"""
+    print(f"📊 Замер на {result.get('simulate') or 'шинах I2C'} (коммит {result.get('revision') or '-'})")
+    current = flatten(result["metrics"])
+    before = flatten(previous["metrics"]) if previous else {}
+    if previous:
+        print(f"   сравнение с {previous.get('revision') or '-'}")
+    for name, value in current.items():
+        line = f"   {name:<48}{value:>12}"
+        if name in before:
+            delta = value - before[name]
+            line += f"{before[name]:>12}{delta:>+12.2f}"
+        print(line)
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)
+
+    if args.transports:
+        result = {
+            "generated_at": time.time(),
+            "revision": git_revision(),
+            "metrics": {"transports": bench_transports(args.samples)},
+        }
+    else:
+        isolate_environment()
+        result = Benchmark(args).run()
+
+    print_results(result, previous)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"💾 Результат сохранен: {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Monitor Control - командная строка для горячих клавиш и скриптов.
+
+    monitor_control.py set --monitor 1 --brightness +10
+    monitor_control.py set --monitor all --brightness 40
+    monitor_control.py get --monitor 2
+    monitor_control.py list --json
+    monitor_control.py scene Презентация
+    monitor_control.py scene Игры --save
+
+Если приложение запущено (трей или --daemon), команда передается ему через
+локальный API и выполняется за миллисекунды, с анимацией и без борьбы за шину.
+Иначе используется прямой путь через monitorcontrol: без PyQt6 и без чтения
+строки возможностей, значения записываются сразу.
+"""
+
+import sys
+import json
+import argparse
+
+import monitor_ipc
+
+CLI_COMMANDS = ("set", "get", "list", "scene")
+
+def parse_args(argv):
+    """Разбирает команду CLI"""
+    parser = argparse.ArgumentParser(prog="monitor_control.py", description="Управление мониторами через DDC/CI")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    set_parser = subparsers.add_parser("set", help="изменить яркость, громкость или вход")
+    set_parser.add_argument("--monitor", "-m", default="all", help="номер монитора (с 1), идентификатор EDID или all")
+    set_parser.add_argument("--brightness", "-b", help="яркость 0-100 или изменение (+10, -10)")
+    set_parser.add_argument("--volume", "-v", help="громкость 0-100 или изменение (+10, -10)")
+    set_parser.add_argument("--input", "-i", help="вход: код VCP или название (DP-1, HDMI-1, ...)")
+
+    get_parser = subparsers.add_parser("get", help="показать состояние монитора")
+    get_parser.add_argument("--monitor", "-m", default="all", help="номер монитора (с 1), идентификатор EDID или all")
+    get_parser.add_argument("--json", action="store_true", help="вывести ответ в JSON")
+
+    list_parser = subparsers.add_parser("list", help="показать все мониторы")
+    list_parser.add_argument("--json", action="store_true", help="вывести ответ в JSON")
+
+    scene_parser = subparsers.add_parser("scene", help="применить или сохранить сцену (без имени - список сцен)")
+    scene_parser.add_argument("name", nargs="?", help="имя сцены")
+    scene_parser.add_argument("--save", action="store_true", help="сохранить текущие значения мониторов как сцену")
+    scene_parser.add_argument("--json", action="store_true", help="вывести ответ в JSON")
+
+    args = parser.parse_args(argv)
+    if args.command == "scene" and args.save and not args.name:
+        parser.error("укажите имя сохраняемой сцены")
+    if args.command == "set" and args.brightness is None and args.volume is None and args.input is None:
+        parser.error("укажите --brightness, --volume или --input")
+    return args
+
+def build_request(args):
+    """Запрос API по аргументам командной строки"""
+    if args.command == "list":
+        return {"cmd": "list"}
+    if args.command == "scene":
+        if not args.name:
+            return {"cmd": "scenes"}
+        return {"cmd": "scene", "name": args.name, "save": args.save}
+
+    request = {"cmd": args.command, "monitor": args.monitor}
+    if args.command == "set":
+        for field in ("brightness", "volume", "input"):
+            value = getattr(args, field)
+            if value is None:
+                continue
+            # Абсолютные значения передаем числами, относительные ("+10") - строками
+            request[field] = int(value) if value.isdigit() else value
+    return request
+
+def format_monitor(monitor):
+    """Строка состояния монитора для вывода в терминал"""
+    parts = []
+    if monitor.get("brightness") is not None:
+        parts.append(f"яркость {monitor['brightness']}%")
+    if monitor.get("input") is not None:
+        parts.append(f"вход {monitor.get('input_name') or monitor_ipc.get_input_name(monitor['input'])}")
+    if monitor.get("volume") is not None:
+        parts.append(f"громкость {monitor['volume']}%")
+    name = monitor.get("model") or monitor.get("identity") or ""
+    return f"Монитор {monitor['monitor']}" + (f" ({name})" if name else "") + ": " + (", ".join(parts) or "нет данных")
+
+def print_response(args, response):
+    """Выводит результат команды"""
+    if getattr(args, "json", False):
+        print(json.dumps(response, ensure_ascii=False, indent=2))
+    elif args.command in ("get", "list"):
+        for monitor in response.get("monitors", []):
+            print(format_monitor(monitor))
+    elif "scenes" in response:
+        for name, scene in response["scenes"].items():
+            print(f"🎬 {name}: " + "; ".join(f"{target}: " + ", ".join(f"{key} {value}" for key, value in values.items())
+                                           for target, values in scene.items()))
+
+def run_direct(request):
+    """Прямой путь без работающего приложения: только нужные VCP коды, без PyQt6 и строки возможностей"""
+    if request["cmd"] in ("scene", "scenes"):
+        raise ValueError("сцены применяет работающее приложение (трей или --daemon)")
+
+    import monitorcontrol
+
+    monitors = monitorcontrol.get_monitors()
+    if not monitors:
+        raise ValueError("мониторы не найдены")
+    target = str(request.get("monitor", "all"))
+    if target == "all":
+        selected = list(enumerate(monitors))
+    elif target.isdigit() and 1 <= int(target) <= len(monitors):
+        selected = [(int(target) - 1, monitors[int(target) - 1])]
+    else:
+        # Идентификаторы EDID знает только приложение, напрямую мониторы доступны по номеру
+        raise ValueError(f"монитор не найден: {target}")
+
+    results = []
+    for index, monitor in selected:
+        result = {"monitor": index + 1}
+        with monitor:
+            if request["cmd"] in ("get", "list"):
+                result["brightness"] = monitor.get_luminance()
+                result["input"] = int(monitor.get_input_source())
+            else:
+                if "brightness" in request:
+                    current = monitor.get_luminance() if isinstance(request["brightness"], str) else None
+                    result["brightness"] = monitor_ipc.resolve_level(request["brightness"], current)
+                    monitor.set_luminance(result["brightness"])
+                if "volume" in request:
+                    current = monitor.vcp.get_vcp_feature(monitor_ipc.VCP_AUDIO_VOLUME)[0] if isinstance(request["volume"], str) else None
+                    result["volume"] = monitor_ipc.resolve_level(request["volume"], current)
+                    monitor.vcp.set_vcp_feature(monitor_ipc.VCP_AUDIO_VOLUME, result["volume"])
+                if "input" in request:
+                    result["input"] = monitor_ipc.resolve_input_code(request["input"])
+                    monitor.set_input_source(result["input"])
+        results.append(result)
+    return {"ok": True, "monitors": results, "direct": True}
+
+def main(argv):
+    """Точка входа CLI: возвращает код выхода"""
+    args = parse_args(argv)
+    request = build_request(args)
+
+    try:
+        try:
+            response = monitor_ipc.send_request(request)
+        except monitor_ipc.NotRunningError:
+            response = run_direct(request)
+    except (monitor_ipc.IPCError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    except Exception as e:
+        print(f"❌ Ошибка DDC/CI: {e}", file=sys.stderr)
+        return 1
+
+    if not response.get("ok"):
+        print(f"❌ {response.get('error', 'неизвестная ошибка')}", file=sys.stderr)
+        return 1
+    print_response(args, response)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -5,26 +5,126 @@ Monitor Control
 
 import sys
 import os
-import traceback
+import argparse
+import signal
+import logging
+import logging.handlers
 import threading
 import time
 import json
+import glob
+import collections
+import itertools
+import tempfile
+import fcntl
+import errno
+import random
+import concurrent.futures
+
+# Команды CLI (set/get/list) не требуют PyQt6: запрос уходит работающему экземпляру
+import monitor_cli
+if __name__ == "__main__" and sys.argv[1:2] and sys.argv[1] in monitor_cli.CLI_COMMANDS:
+    sys.exit(monitor_cli.main(sys.argv[1:]))
+
 from PyQt6.QtWidgets import (
     QApplication, QSystemTrayIcon, QMenu
 )
-from PyQt6.QtGui import QIcon, QPixmap, QPainter, QBrush, QPen, QLinearGradient, QRadialGradient, QColor
-from PyQt6.QtCore import Qt, QTimer, QObject, pyqtSignal, QRectF
+from PyQt6.QtGui import QAction, QIcon, QPixmap, QPainter, QBrush, QPen, QLinearGradient, QRadialGradient, QColor
+from PyQt6.QtCore import Qt, QCoreApplication, QTimer, QObject, QSocketNotifier, pyqtSignal, pyqtSlot, QRectF
+from PyQt6.QtNetwork import QLocalServer
+
+import monitor_ipc
+import monitor_sim
 
 # Константы анимации
 TARGET_ANIMATION_DURATION_MS = 400  # Целевая длительность анимации
 ANIMATION_TOLERANCE_MS = 200        # Допустимое отклонение (±200ms)
-MIN_ANIMATION_STEPS = 20            # Минимальное количество шагов
-MAX_ANIMATION_STEPS = 80            # Максимальное количество шагов
-DEFAULT_ANIMATION_STEPS = 40        # Начальное количество шагов
-UPDATE_INTERVAL_MS = 10000          # Интервал обновления информации о яркости (10 секунд)
+MAX_ANIMATION_STEPS = 80            # Максимальное количество кадров (ограничивает частоту записей)
+DEFAULT_WRITE_LATENCY_MS = 10       # Оценка задержки записи, пока нет измерений
+LATENCY_HISTORY_SIZE = 20           # Сколько последних измерений задержки записи хранить
+PERCEPTUAL_GAMMA = 2.2              # Яркость VCP примерно линейна по светимости, глаз воспринимает ее степенью 1/2.2
+PERCEPTUAL_MIN_STEP = 0.02          # Минимальное заметное изменение между кадрами (доля шкалы восприятия)
+UPDATE_INTERVAL_MS = 10000          # Базовый интервал опроса монитора (10 секунд)
+POLL_MIN_INTERVAL_MS = 1000         # Интервал быстрого опроса после взаимодействия или изменения
+POLL_MAX_INTERVAL_MS = 120000       # Максимальный интервал опроса при стабильных значениях
+POLL_BACKOFF_FACTOR = 2             # Во сколько раз увеличивать интервал, если ничего не изменилось
+POLL_BURST_COUNT = 5                # Сколько быстрых опросов делать после взаимодействия
+HOTPLUG_DEBOUNCE_MS = 2000          # Пауза после события подключения до пересканирования (DDC/CI оживает не сразу)
+SESSION_IDLE_TIMEOUT_MS = 2000      # Через сколько простоя закрывать дескриптор /dev/i2c монитора
+PROBE_TIMEOUT_MS = 8000             # Сколько ждать первого чтения монитора при сканировании (шины опрашиваются параллельно)
+DDC_TRANSPORT = "monitorcontrol"    # Транспорт DDC/CI: "monitorcontrol", "i2c-dev" (прямой /dev/i2c-N) или "auto" (i2c-dev, если монитор через него отвечает)
+MONITOR_STATE_MAX_AGE_MS = 5000     # Состояние старше этого перечитывается при периодическом обновлении
+SHADOW_MAX_AGE_MS = 2000            # Значение VCP, записанное или прочитанное не раньше этого, берется из памяти, а не с шины
+
+# Транзакции DDC/CI: повтор временных ошибок (NAK, неверная контрольная сумма) с паузой
+DDC_MAX_ATTEMPTS = 4                # Попыток на одну операцию
+DDC_RETRY_BASE_MS = 40              # Первая пауза перед повтором, дальше удваивается (со случайным разбросом)
+DDC_RETRY_BUDGET_MS = 500           # Повтор только если укладываемся в этот бюджет от начала операции
+DDC_CAPABILITIES_RETRY_BUDGET_MS = 5000  # Чтение строки возможностей само по себе занимает около секунды
+DDC_VERIFY_FINAL_WRITE = True       # Перечитывать конечную яркость анимации и повторять запись при расхождении
+HEALTH_EWMA_ALPHA = 0.1             # Вес последней попытки в доле ошибок монитора
+HEALTH_MAX_PACING = 4.0             # Во сколько раз максимум замедлять кадры и паузы для нестабильного монитора
+HEALTH_FLAKY_GAP_MS = 20            # Дополнительная пауза между транзакциями на каждую единицу замедления
+
+# Коды VCP
+VCP_BRIGHTNESS = 0x10
+VCP_CONTRAST = 0x12
+VCP_COLOR_PRESET = 0x14
+VCP_INPUT_SOURCE = 0x60
+VCP_AUDIO_VOLUME = monitor_ipc.VCP_AUDIO_VOLUME
+
+# Названия цветовых режимов (VCP 0x14, MCCS)
+COLOR_PRESET_NAMES = {
+    1: "sRGB",
+    2: "Нативный",
+    3: "4000 K",
+    4: "5000 K",
+    5: "6500 K",
+    6: "7500 K",
+    7: "8200 K",
+    8: "9300 K",
+    9: "10000 K",
+    10: "11500 K",
+    11: "Пользовательский 1",
+    12: "Пользовательский 2",
+    13: "Пользовательский 3",
+}
+
+# Кэш иконок трея по уровню яркости
+ICON_CACHE_SIZE = 128               # Максимум иконок в LRU кэше (101 уровень + запас)
+ICON_PRERENDER = "first_use"        # Предварительная отрисовка всех уровней: "startup", "first_use" или None
 
 # Путь для сохранения настроек адаптивной анимации
 SETTINGS_FILE = os.path.expanduser("~/.monitor_control_settings.json")
+SETTINGS_FLUSH_DELAY_MS = 5000      # Изменения настроек копятся в памяти и пишутся на диск пачкой
+LAST_SESSION_KEY = "last_session"   # Ключ настроек с мониторами и их значениями на момент выхода
+SCENES_KEY = "scenes"               # Ключ настроек с именованными сценами
+
+# Сцены по умолчанию (записываются в настройки при первом запуске, их можно править в файле).
+# Мониторы: "all", номер (с 1) или идентификатор EDID; значения - как в команде set API
+DEFAULT_SCENES = {
+    "День": {"all": {"brightness": 80}},
+    "Вечер": {"all": {"brightness": 30}},
+    "Презентация": {"all": {"brightness": 100, "volume": 50}},
+}
+# Журналирование: на уровне INFO пишутся только редкие события, кадры анимации и опрос - на DEBUG
+DEFAULT_LOG_LEVEL = "INFO"
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+LOG_FILE_MAX_BYTES = 1024 * 1024    # Размер файла журнала до ротации
+LOG_FILE_BACKUP_COUNT = 3           # Сколько старых файлов журнала хранить
+
+log = logging.getLogger("monitor_control")
+animation_log = logging.getLogger("monitor_control.animation")
+ddc_log = logging.getLogger("monitor_control.ddc")
+ui_log = logging.getLogger("monitor_control.ui")
+settings_log = logging.getLogger("monitor_control.settings")
+
+# Снимок статистики задержек DDC (для --stats)
+STATS_FILE = os.path.expanduser("~/.monitor_control_stats.json")
+STATS_SNAPSHOT_INTERVAL_MS = 60000  # Как часто работающее приложение обновляет снимок статистики
+STATS_SAMPLE_SIZE = 1000            # Сколько последних измерений каждой операции хранить для перцентилей
+# Кэш возможностей (VCP capabilities) мониторов, ключ - идентификатор монитора из EDID
+CAPABILITIES_FILE = os.path.expanduser("~/.monitor_control_capabilities.json")
 
 def create_monitor_icon():
     """Создает красивую иконку монитора с градиентами"""
@@ -254,526 +354,2718 @@ def create_dynamic_monitor_icon(brightness_level=None):
     
     return QIcon(scaled_pixmap)
 
+# LRU кэш отрисованных иконок: уровень яркости (0-100 или None) -> QIcon
+_icon_cache = collections.OrderedDict()
+
+def get_brightness_icon(brightness_level=None):
+    """Возвращает иконку для уровня яркости из кэша, отрисовывая её только при промахе"""
+    key = None if brightness_level is None else max(0, min(100, int(round(brightness_level))))
+    
+    icon = _icon_cache.get(key)
+    if icon is not None:
+        _icon_cache.move_to_end(key)
+        return icon
+    
+    if ICON_PRERENDER == "first_use" and not _icon_cache:
+        prerender_brightness_icons()
+        return get_brightness_icon(key)
+    
+    icon = create_dynamic_monitor_icon(key)
+    _icon_cache[key] = icon
+    while len(_icon_cache) > ICON_CACHE_SIZE:
+        _icon_cache.popitem(last=False)
+    return icon
+
+def prerender_brightness_icons():
+    """Отрисовывает иконки всех 101 уровня яркости (и без уровня) заранее"""
+    start_time = time.perf_counter()
+    for level in [None] + list(range(101)):
+        if level not in _icon_cache:
+            _icon_cache[level] = create_dynamic_monitor_icon(level)
+    while len(_icon_cache) > ICON_CACHE_SIZE:
+        _icon_cache.popitem(last=False)
+    ui_log.debug("🎨 Иконки яркости отрисованы заранее: %s за %.1fms", len(_icon_cache), (time.perf_counter() - start_time) * 1000)
+
 class UIUpdater(QObject):
     """Класс для безопасного обновления UI из других потоков"""
-    update_display = pyqtSignal()
     update_icon = pyqtSignal(int)
+    monitor_state = pyqtSignal(str, object)  # Новые значения состояния монитора (после нашей записи)
+    monitor_polled = pyqtSignal(str, object)  # Результат чтения состояния монитора из DDC потока
+    monitors_scanned = pyqtSignal(object)  # Список (идентификатор, монитор, значения) после пересканирования
+
+class PollScheduler:
+    """Адаптивный опрос мониторов: у каждого монитора свой интервал.
+    
+    Пока значения не меняются, интервал растет (экспоненциальная задержка);
+    после нашей записи или замеченного изменения (например, кнопками монитора)
+    несколько раз опрашиваем быстро. Пока экран заблокирован или меню закрыто,
+    опрос приостановлен (кроме быстрых опросов после взаимодействия).
+    """
+    
+    def __init__(self, poll_callback):
+        self.poll_callback = poll_callback  # poll_callback(monitor_key) -> False, если опросить нельзя
+        self.monitors = {}  # monitor_key -> {"interval": мс, "due": time.monotonic(), "burst": n}
+        self.menu_open = False
+        self.screen_locked = False
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._on_timer)
+        
+    def add_monitor(self, monitor_key):
+        """Начинает опрос монитора с базовым интервалом"""
+        self.monitors[monitor_key] = {"interval": UPDATE_INTERVAL_MS, "due": time.monotonic() + UPDATE_INTERVAL_MS / 1000.0, "burst": 0}
+        self._reschedule()
+        
+    def remove_monitor(self, monitor_key):
+        """Прекращает опрос монитора"""
+        self.monitors.pop(monitor_key, None)
+        self._reschedule()
+        
+    def notify_interaction(self, monitor_key):
+        """Наша запись на монитор: несколько раз быстро проверяем результат"""
+        entry = self.monitors.get(monitor_key)
+        if entry:
+            self._start_burst(entry)
+            self._reschedule()
+        
+    def on_result(self, monitor_key, changed):
+        """Результат опроса: при изменениях ускоряемся, при стабильных значениях замедляемся"""
+        entry = self.monitors.get(monitor_key)
+        if entry is None:
+            return
+        if changed:
+            self._start_burst(entry)
+        elif entry["burst"] == 0:
+            entry["interval"] = min(POLL_MAX_INTERVAL_MS, max(UPDATE_INTERVAL_MS, entry["interval"] * POLL_BACKOFF_FACTOR))
+            entry["due"] = time.monotonic() + entry["interval"] / 1000.0
+        self._reschedule()
+        
+    def set_menu_open(self, is_open):
+        """Меню открыто - опрашиваем, закрыто - только быстрые опросы после взаимодействия"""
+        self.menu_open = is_open
+        if is_open:
+            # Пока пользователь смотрит на меню, не ждем накопленную задержку
+            now = time.monotonic()
+            for entry in self.monitors.values():
+                entry["interval"] = min(entry["interval"], UPDATE_INTERVAL_MS)
+                entry["due"] = min(entry["due"], now + entry["interval"] / 1000.0)
+        self._reschedule()
+        
+    def set_screen_locked(self, locked):
+        """На заблокированном экране мониторы не опрашиваются"""
+        ui_log.info("🔒 Экран %s, опрос %s", 'заблокирован' if locked else 'разблокирован', 'приостановлен' if locked else 'возобновлен')
+        self.screen_locked = locked
+        self._reschedule()
+        
+    def _start_burst(self, entry):
+        entry["burst"] = POLL_BURST_COUNT
+        entry["interval"] = POLL_MIN_INTERVAL_MS
+        entry["due"] = time.monotonic() + POLL_MIN_INTERVAL_MS / 1000.0
+        
+    def _is_active(self, entry):
+        return not self.screen_locked and (self.menu_open or entry["burst"] > 0)
+        
+    def _reschedule(self):
+        """Перезапускает таймер до ближайшего опроса"""
+        due_times = [entry["due"] for entry in self.monitors.values() if self._is_active(entry)]
+        if not due_times:
+            self.timer.stop()
+            return
+        delay_ms = max(0, int((min(due_times) - time.monotonic()) * 1000))
+        self.timer.start(delay_ms)
+        
+    def _on_timer(self):
+        now = time.monotonic()
+        for monitor_key, entry in list(self.monitors.items()):
+            if not self._is_active(entry) or entry["due"] > now:
+                continue
+            if self.poll_callback(monitor_key):
+                if entry["burst"] > 0:
+                    entry["burst"] -= 1
+                    if entry["burst"] == 0:
+                        entry["interval"] = UPDATE_INTERVAL_MS
+                entry["due"] = now + entry["interval"] / 1000.0
+            else:
+                # Монитор занят (например, анимацией) - попробуем чуть позже
+                entry["due"] = now + POLL_MIN_INTERVAL_MS / 1000.0
+        self._reschedule()
+
+class ScreenLockWatcher(QObject):
+    """Следит за блокировкой экрана через D-Bus (org.freedesktop.ScreenSaver и org.gnome.ScreenSaver)"""
+    locked_changed = pyqtSignal(bool)
+    
+    SERVICES = [
+        ("/org/freedesktop/ScreenSaver", "org.freedesktop.ScreenSaver"),
+        ("/org/gnome/ScreenSaver", "org.gnome.ScreenSaver"),
+    ]
     
     def __init__(self):
         super().__init__()
-        self.update_timer = QTimer()
-        self.update_timer.setSingleShot(True)
-        self.update_timer.timeout.connect(self._do_update)
-        self.pending_update = False
-        
-    def request_update(self):
-        """Запрашивает обновление с дебаунсингом"""
-        if not self.pending_update:
-            self.pending_update = True
-            self.update_timer.start(500)  # Обновление через 500ms
-            
-    def _do_update(self):
-        """Выполняет фактическое обновление"""
-        self.pending_update = False
-        self.update_display.emit()
-    
-class BrightnessAnimator:
-    """Класс для плавной анимации изменения яркости с адаптивным timing'ом"""
-    
-    def __init__(self, monitor, monitor_name: str, ui_updater=None):
+        try:
+            from PyQt6.QtDBus import QDBusConnection
+        except ImportError:
+            ui_log.warning("⚠️  QtDBus недоступен, блокировка экрана не отслеживается")
+            return
+        
+        bus = QDBusConnection.sessionBus()
+        if not bus.isConnected():
+            ui_log.warning("⚠️  Нет подключения к сессионной шине D-Bus, блокировка экрана не отслеживается")
+            return
+        for path, interface in self.SERVICES:
+            bus.connect("", path, interface, "ActiveChanged", self._on_active_changed)
+            
+    @pyqtSlot(bool)
+    def _on_active_changed(self, active):
+        self.locked_changed.emit(active)
+
+class HotplugWatcher(QObject):
+    """Следит за подключением и отключением мониторов через udev (подсистемы drm и i2c).
+    
+    События приходят пачками (разъем, DDC-шина, MST-хаб), поэтому пересканирование
+    откладывается на HOTPLUG_DEBOUNCE_MS после последнего события.
+    """
+    monitors_changed = pyqtSignal()
+    
+    def __init__(self):
+        super().__init__()
+        self.monitor = None
+        self.notifier = None
+        self.debounce_timer = QTimer()
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.timeout.connect(self.monitors_changed.emit)
+        try:
+            import pyudev
+            self.monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+            self.monitor.filter_by("drm")
+            self.monitor.filter_by("i2c")
+            self.monitor.start()
+        except Exception as e:
+            ddc_log.warning("⚠️  Отслеживание подключения мониторов недоступно: %s", e)
+            self.monitor = None
+            return
+        
+        self.notifier = QSocketNotifier(self.monitor.fileno(), QSocketNotifier.Type.Read)
+        self.notifier.activated.connect(self._on_events)
+        ddc_log.info("🔌 Отслеживание подключения мониторов включено")
+        
+    def _on_events(self):
+        # Вычитываем все накопившиеся события, пересканируем один раз
+        while self.monitor.poll(timeout=0) is not None:
+            pass
+        self.debounce_timer.start(HOTPLUG_DEBOUNCE_MS)
+
+class LatencyStats:
+    """Задержки одной операции DDC: последние измерения для перцентилей и счетчики"""
+    
+    def __init__(self, sample_size=STATS_SAMPLE_SIZE):
+        self.samples = collections.deque(maxlen=sample_size)
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        
+    def record(self, latency_ms, ok=True):
+        self.samples.append(latency_ms)
+        self.count += 1
+        self.total_ms += latency_ms
+        if not ok:
+            self.errors += 1
+            
+    def percentile(self, p):
+        """Перцентиль по последним измерениям (None, если измерений нет)"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+    
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "retries": self.retries,
+            "total_ms": round(self.total_ms, 2),
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": max(self.samples) if self.samples else None,
+        }
+
+class AnimationStats:
+    """Анимации одного кода VCP: отклонение длительности от TARGET_ANIMATION_DURATION_MS и число записей"""
+    
+    def __init__(self, sample_size=STATS_SAMPLE_SIZE):
+        self.durations = LatencyStats(sample_size)
+        self.writes = collections.deque(maxlen=sample_size)
+        
+    def record(self, duration_ms, writes):
+        self.durations.record(duration_ms)
+        self.writes.append(writes)
+        
+    def snapshot(self):
+        errors = sorted(abs(duration - TARGET_ANIMATION_DURATION_MS) for duration in self.durations.samples)
+        return {
+            "count": self.durations.count,
+            "p50_ms": self.durations.percentile(50),
+            "p95_ms": self.durations.percentile(95),
+            "max_ms": max(self.durations.samples) if self.durations.samples else None,
+            "error_p50_ms": errors[int(0.5 * (len(errors) - 1))] if errors else None,
+            "error_p95_ms": errors[int(round(0.95 * (len(errors) - 1)))] if errors else None,
+            "writes_avg": round(sum(self.writes) / len(self.writes), 1) if self.writes else None,
+            "writes_max": max(self.writes) if self.writes else None,
+        }
+
+class MonitorHealth:
+    """Надежность шины монитора: сглаженная доля неудачных попыток DDC.
+    
+    Чем чаще монитор не отвечает, тем больше pacing() - во столько раз
+    реже идут кадры анимации и длиннее паузы между транзакциями.
+    """
+    
+    def __init__(self):
+        self.failure_rate = 0.0
+        self.consecutive_failures = 0
+        self.lock = threading.Lock()
+        
+    def record(self, ok):
+        """Учитывает результат одной попытки"""
+        with self.lock:
+            self.failure_rate += HEALTH_EWMA_ALPHA * ((0.0 if ok else 1.0) - self.failure_rate)
+            self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+            
+    def pacing(self):
+        """Множитель интервалов: 1.0 для надежного монитора, до HEALTH_MAX_PACING для нестабильного"""
+        return 1.0 + (HEALTH_MAX_PACING - 1.0) * min(1.0, self.failure_rate * 2)
+    
+    def snapshot(self):
+        return {
+            "failure_rate": round(self.failure_rate, 3),
+            "pacing": round(self.pacing(), 2),
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+class MonitorProfile:
+    """Статистика DDC одного монитора: задержки по операциям и время занятости шины"""
+    
+    def __init__(self, name, bus=None):
+        self.name = name
+        self.bus = bus
+        self.transport = None  # Через что монитор подключен (monitorcontrol, i2c-dev, sim)
+        self.operations = {}  # имя операции -> LatencyStats
+        self.animations = {}  # ключ кода VCP (brightness, contrast) -> AnimationStats
+        self.busy_ms = 0.0    # Суммарное время выполнения задач в потоке монитора
+        self.jobs = 0
+        self.coalesced = 0    # Записи, замененные более новым значением до отправки на шину
+        self.health = MonitorHealth()  # Переживает переподключение монитора вместе со статистикой
+        self.lock = threading.Lock()
+        
+    def record(self, operation, latency_ms, ok=True):
+        with self.lock:
+            stats = self.operations.get(operation)
+            if stats is None:
+                stats = self.operations[operation] = LatencyStats()
+            stats.record(latency_ms, ok)
+            
+    def record_retry(self, operation):
+        with self.lock:
+            stats = self.operations.get(operation)
+            if stats is None:
+                stats = self.operations[operation] = LatencyStats()
+            stats.retries += 1
+            
+    def record_animation(self, key, duration_ms, writes):
+        """Учитывает завершенную анимацию: длительность и число записей на шину"""
+        with self.lock:
+            stats = self.animations.get(key)
+            if stats is None:
+                stats = self.animations[key] = AnimationStats()
+            stats.record(duration_ms, writes)
+            
+    def add_busy(self, busy_ms):
+        with self.lock:
+            self.busy_ms += busy_ms
+            self.jobs += 1
+            
+    def add_coalesced(self):
+        with self.lock:
+            self.coalesced += 1
+            
+    def timed(self, operation, func):
+        """Оборачивает вызов операции DDC замером задержки"""
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            ok = False
+            try:
+                result = func(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                self.record(operation, (time.perf_counter() - start) * 1000, ok)
+        return wrapper
+    
+    def snapshot(self):
+        with self.lock:
+            return {
+                "bus": self.bus,
+                "transport": self.transport,
+                "busy_ms": round(self.busy_ms, 2),
+                "jobs": self.jobs,
+                "coalesced": self.coalesced,
+                "health": self.health.snapshot(),
+                "operations": {operation: stats.snapshot() for operation, stats in sorted(self.operations.items())},
+                "animations": {key: stats.snapshot() for key, stats in sorted(self.animations.items())},
+            }
+    
+    def trace(self):
+        """Записанные задержки операций (для воспроизведения на имитированном мониторе)"""
+        with self.lock:
+            return {
+                "bus": self.bus,
+                "transport": self.transport,
+                "operations": {
+                    operation: {"count": stats.count, "errors": stats.errors, "samples": [round(sample, 3) for sample in stats.samples]}
+                    for operation, stats in sorted(self.operations.items())
+                },
+            }
+
+class DDCProfiler:
+    """Встроенная статистика задержек DDC/CI по мониторам (снимок в STATS_FILE, вывод через --stats)"""
+    
+    def __init__(self):
+        self.profiles = {}
+        self.started_at = time.time()
+        self.trace_path = None  # Куда записывать трассу задержек (--record-trace)
+        self.lock = threading.Lock()
+        
+    def monitor(self, name, bus=None):
+        """Возвращает статистику монитора (одну на идентификатор, в том числе после переподключения)"""
+        with self.lock:
+            profile = self.profiles.get(name)
+            if profile is None:
+                profile = self.profiles[name] = MonitorProfile(name, bus)
+            profile.bus = bus
+            return profile
+        
+    def snapshot(self):
+        with self.lock:
+            profiles = list(self.profiles.values())
+        now = time.time()
+        return {
+            "generated_at": now,
+            "uptime_s": round(now - self.started_at, 1),
+            "monitors": {profile.name: profile.snapshot() for profile in profiles},
+        }
+    
+    def trace(self):
+        """Трасса задержек DDC всех мониторов: последние измерения каждой операции (формат monitor_sim)"""
+        with self.lock:
+            profiles = list(self.profiles.values())
+        return {
+            "generated_at": time.time(),
+            "monitors": {profile.name: profile.trace() for profile in profiles},
+        }
+    
+    def write_snapshot(self, path=STATS_FILE):
+        """Сохраняет снимок статистики на диск (и трассу задержек, если она записывается)"""
+        try:
+            write_json_atomic(path, self.snapshot())
+            if self.trace_path:
+                write_json_atomic(self.trace_path, self.trace())
+        except Exception as e:
+            settings_log.warning("⚠️  Ошибка сохранения статистики: %s", e)
+
+class DDCVerifyError(Exception):
+    """Перечитанное после записи значение не совпало с записанным"""
+
+def classify_ddc_error(error):
+    """Делит ошибки DDC на временные (стоит повторить) и постоянные: "transient" или "fatal".
+    
+    NAK, неверная контрольная сумма или длина ответа - обычное дело для DDC/CI под
+    нагрузкой. Нет прав, нет устройства или неверный аргумент повтором не исправить.
+    """
+    import monitorcontrol.vcp
+    
+    if isinstance(error, DDCVerifyError):
+        return "transient"
+    if isinstance(error, monitorcontrol.vcp.VCPPermissionError):
+        return "fatal"
+    cause = error if isinstance(error, OSError) else error.__cause__
+    if isinstance(cause, OSError) and cause.errno in (errno.EACCES, errno.EPERM, errno.ENOENT, errno.ENODEV, errno.ENXIO, errno.EBADF):
+        return "fatal"
+    if isinstance(error, (monitorcontrol.vcp.VCPIOError, OSError)):
+        return "transient"
+    return "fatal"
+
+class ShadowState:
+    """Теневое состояние монитора: последнее известное значение каждого кода VCP и время,
+    когда оно было записано нами или прочитано с шины.
+    
+    Значения обновляет только поток монитора (MonitorSession), поэтому они
+    авторитетны: после нашей записи читать её обратно с шины не нужно.
+    """
+    
+    def __init__(self):
+        self.values = {}  # код VCP -> (значение, time.monotonic())
+        self.lock = threading.Lock()
+        
+    def record(self, code, value):
+        with self.lock:
+            self.values[code] = (value, time.monotonic())
+            
+    def get(self, code, max_age_ms):
+        """Значение кода, если оно не старше max_age_ms, иначе None"""
+        with self.lock:
+            entry = self.values.get(code)
+        if entry is None or (time.monotonic() - entry[1]) * 1000 > max_age_ms:
+            return None
+        return entry[0]
+    
+    def invalidate(self, code=None):
+        """Забывает значение кода (или все), например после неудачной записи"""
+        with self.lock:
+            if code is None:
+                self.values.clear()
+            else:
+                self.values.pop(code, None)
+
+class SessionVCP:
+    """VCP монитора, у которого прямые обращения к кодам VCP идут через транзакции сессии"""
+    
+    def __init__(self, vcp, session):
+        self._vcp = vcp
+        self._session = session
+        
+    def __getattr__(self, name):
+        attribute = getattr(self._vcp, name)
+        if name == "get_vcp_feature":
+            def get_feature(code, max_age_ms=SHADOW_MAX_AGE_MS):
+                # В теневом состоянии только значение (как у get_luminance), максимум помнит сессия
+                value = self._session.shadow.get(code, max_age_ms)
+                if value is not None:
+                    return value, self._session.maximums.get(code, 100)
+                value, maximum = self._session.transaction(f"{name}:0x{code:02X}", attribute, code, code=code)
+                self._session.shadow.record(code, value)
+                self._session.maximums[code] = maximum
+                return value, maximum
+            return get_feature
+        if name == "set_vcp_feature":
+            def set_feature(code, value, verify=False):
+                check = (lambda: self._vcp.get_vcp_feature(code)[0] == value) if verify else None
+                result = self._session.transaction(f"{name}:0x{code:02X}", attribute, code, value, verify=check, code=code)
+                self._session.shadow.record(code, value)
+                return result
+            return set_feature
+        if name == "get_vcp_capabilities":
+            return lambda: self._session.transaction(name, attribute)
+        return attribute
+
+class IPCServer(QObject):
+    """Локальный API (протокол в monitor_ipc): скрипты и CLI управляют мониторами через этот экземпляр.
+    
+    Единственный владелец шины - этот процесс, клиенты не открывают /dev/i2c сами.
+    Запросы обрабатываются в потоке GUI и только ставят задачи в DDCEngine.
+    """
+    
+    def __init__(self, path=None):
+        super().__init__()
+        self.path = path or monitor_ipc.socket_path()
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self._on_new_connection)
+        self.buffers = {}  # соединение -> непрочитанные байты
+        
+    def listen(self):
+        """Начинает принимать соединения (сокет упавшего экземпляра удаляется)"""
+        QLocalServer.removeServer(self.path)
+        if not self.server.listen(self.path):
+            log.warning("⚠️  Не удалось открыть сокет API %s: %s", self.path, self.server.errorString())
+            return False
+        log.info("📡 API доступен через %s", self.path)
+        return True
+    
+    def close(self):
+        """Закрывает сокет при выходе"""
+        self.server.close()
+        
+    def _on_new_connection(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            self.buffers[connection] = b""
+            connection.readyRead.connect(lambda connection=connection: self._on_ready_read(connection))
+            connection.disconnected.connect(lambda connection=connection: self._on_disconnected(connection))
+            
+    def _on_ready_read(self, connection):
+        buffer = self.buffers.get(connection, b"") + bytes(connection.readAll())
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            try:
+                response = handle_ipc_request(monitor_ipc.decode_message(line), lambda response, connection=connection: self._send(connection, response))
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            # None - ответ придет позже (например, после чтения монитора)
+            if response is not None:
+                self._send(connection, response)
+        self.buffers[connection] = buffer
+        
+    def _send(self, connection, response):
+        if connection not in self.buffers:
+            return  # Клиент уже отключился
+        connection.write(monitor_ipc.encode_message(response))
+        connection.flush()
+        
+    def _on_disconnected(self, connection):
+        self.buffers.pop(connection, None)
+        connection.deleteLater()
+
+class MonitorSession:
+    """Управляемое соединение с монитором: дескриптор DDC остается открытым между операциями.
+    
+    Задачи используют сессию как сам монитор (``with monitor: monitor.get_luminance()``),
+    но выход из контекста не закрывает устройство. Закрывает его рабочий поток
+    после SESSION_IDLE_TIMEOUT_MS простоя.
+    
+    Каждая операция DDC выполняется как транзакция (transaction): временные ошибки
+    повторяются с паузой, записи можно проверить чтением (``set_luminance(v, verify=True)``).
+    """
+    
+    # Методы монитора, выполняемые как транзакции (задержка попадает в статистику)
+    PROFILED_OPERATIONS = ("get_luminance", "set_luminance", "get_input_source", "set_input_source", "get_vcp_capabilities")
+    # Чем перечитать значение после записи для проверки
+    READBACK_OPERATIONS = {"set_luminance": "get_luminance", "set_input_source": "get_input_source"}
+    # Код VCP операции в теневом состоянии
+    OPERATION_CODES = {
+        "get_luminance": VCP_BRIGHTNESS,
+        "set_luminance": VCP_BRIGHTNESS,
+        "get_input_source": VCP_INPUT_SOURCE,
+        "set_input_source": VCP_INPUT_SOURCE,
+    }
+    
+    def __init__(self, monitor, idle_timeout_ms=SESSION_IDLE_TIMEOUT_MS, profile=None):
+        self.monitor = monitor
+        self.idle_timeout = idle_timeout_ms / 1000.0
+        self.is_open = False
+        self.last_used = 0.0
+        self.profile = profile
+        self.health = profile.health if profile is not None else MonitorHealth()
+        self.shadow = ShadowState()
+        self.maximums = {}  # код VCP -> максимальное значение, сообщенное монитором
+        self.last_transaction_end = 0.0
+        self.last_attempt_ms = None  # Длительность последней удачной попытки без проверочного чтения
+        
+    def __getattr__(self, name):
+        # Все остальные методы (get_luminance, set_input_source, vcp...) берем у монитора
+        attribute = getattr(self.monitor, name)
+        code = self.OPERATION_CODES.get(name)
+        if name in self.READBACK_OPERATIONS:
+            getter = getattr(self.monitor, self.READBACK_OPERATIONS[name])
+            def write(value, verify=False):
+                check = (lambda: int(getter()) == int(value)) if verify else None
+                result = self.transaction(name, attribute, value, verify=check, code=code)
+                self.shadow.record(code, int(value))
+                return result
+            return write
+        if code is not None:
+            return lambda max_age_ms=SHADOW_MAX_AGE_MS: self.read(name, code, attribute, max_age_ms=max_age_ms)
+        if name in self.PROFILED_OPERATIONS:
+            return lambda *args, **kwargs: self.transaction(name, attribute, *args, **kwargs)
+        if name == "vcp":
+            return SessionVCP(attribute, self)
+        return attribute
+    
+    def read(self, operation, code, func, *args, max_age_ms=SHADOW_MAX_AGE_MS):
+        """Чтение кода VCP: из теневого состояния, если значение не старше max_age_ms, иначе с шины.
+        
+        max_age_ms=0 - всегда с шины (поиск изменений, сделанных кнопками монитора).
+        """
+        value = self.shadow.get(code, max_age_ms)
+        if value is not None:
+            return value
+        value = self.transaction(operation, func, *args, code=code)
+        self.shadow.record(code, value)
+        return value
+    
+    def transaction(self, operation, func, *args, verify=None, code=None, **kwargs):
+        """Выполняет операцию DDC с повтором временных ошибок.
+        
+        Пауза перед повтором растет вдвое (со случайным разбросом, чтобы не
+        попадать в такт монитору) и умножается на замедление нестабильного
+        монитора. Повторы прекращаются, когда следующая попытка не укладывается
+        в бюджет операции; постоянные ошибки не повторяются. verify() после
+        успешной попытки проверяет результат записи. После неудачи значение
+        кода code в теневом состоянии считается неизвестным.
+        
+        Задержка операции - только сама попытка (func): проверочное чтение учитывается
+        отдельно как verify_<операция>, а last_attempt_ms - длительность удачной попытки
+        без проверки и повторов (модель задержки записи аниматора).
+        """
+        budget_ms = DDC_CAPABILITIES_RETRY_BUDGET_MS if operation == "get_vcp_capabilities" else DDC_RETRY_BUDGET_MS
+        start = time.perf_counter()
+        attempt = 1
+        while True:
+            pacing = self.health.pacing()
+            if pacing > 1.0:
+                # Нестабильному монитору даем больше времени между транзакциями
+                gap = HEALTH_FLAKY_GAP_MS * (pacing - 1.0) / 1000.0
+                wait = self.last_transaction_end + gap - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            
+            attempt_start = time.perf_counter()
+            verify_start = None
+            try:
+                result = func(*args, **kwargs)
+                if verify is not None:
+                    verify_start = time.perf_counter()
+                    if not verify():
+                        raise DDCVerifyError(f"{operation}: значение не подтвердилось чтением")
+            except Exception as e:
+                self.last_transaction_end = time.perf_counter()
+                if self.profile is not None:
+                    self._record_attempt(operation, attempt_start, verify_start, ok=False)
+                self.health.record(False)
+                
+                delay = DDC_RETRY_BASE_MS * (2 ** (attempt - 1)) * pacing * random.uniform(0.5, 1.5) / 1000.0
+                elapsed_ms = (time.perf_counter() - start + delay) * 1000
+                if classify_ddc_error(e) == "fatal" or attempt >= DDC_MAX_ATTEMPTS or elapsed_ms >= budget_ms:
+                    if code is not None:
+                        self.shadow.invalidate(code)
+                    raise
+                
+                ddc_log.debug("🔁 %s: %s, повтор %s через %.0fms", operation, e, attempt, delay * 1000)
+                if self.profile is not None:
+                    self.profile.record_retry(operation)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            
+            self.last_transaction_end = time.perf_counter()
+            self.last_attempt_ms = ((verify_start or self.last_transaction_end) - attempt_start) * 1000
+            if self.profile is not None:
+                self._record_attempt(operation, attempt_start, verify_start, ok=True)
+            self.health.record(True)
+            return result
+        
+    def _record_attempt(self, operation, attempt_start, verify_start, ok):
+        """Задержка попытки в статистике: операция и проверочное чтение - раздельно"""
+        if verify_start is None:
+            self.profile.record(operation, (self.last_transaction_end - attempt_start) * 1000, ok=ok)
+            return
+        # Неподтвержденная запись - неудачная попытка, но ее задержка - только запись
+        self.profile.record(operation, (verify_start - attempt_start) * 1000, ok=ok)
+        self.profile.record(f"verify_{operation}", (self.last_transaction_end - verify_start) * 1000, ok=ok)
+        
+    def __enter__(self):
+        if not self.is_open:
+            if self.profile is not None:
+                self.profile.timed("open", self.monitor.__enter__)()
+            else:
+                self.monitor.__enter__()
+            self.is_open = True
+        return self
+    
+    def __exit__(self, exception_type, exception_value, exception_traceback):
+        self.last_used = time.monotonic()
+        # После ошибки открываем устройство заново, дескриптор мог стать недействительным
+        if exception_type is not None:
+            self.close()
+        return False
+    
+    def idle_remaining(self):
+        """Сколько секунд осталось до закрытия по простою"""
+        return self.last_used + self.idle_timeout - time.monotonic()
+    
+    def close(self):
+        """Закрывает дескриптор устройства"""
+        if not self.is_open:
+            return
+        self.is_open = False
+        try:
+            self.monitor.__exit__(None, None, None)
+        except Exception as e:
+            ddc_log.warning("⚠️  Ошибка закрытия устройства монитора: %s", e)
+
+class MonitorWorker:
+    """Поток ввода-вывода DDC/CI для одного физического монитора.
+    
+    Задачи с ключом (например, "brightness", "volume", "input") объединяются:
+    пока задача ждет в очереди, новая задача с тем же ключом заменяет её,
+    и на шину уходит только последнее значение.
+    """
+    
+    def __init__(self, monitor, monitor_key: str, profile=None):
+        self.monitor = monitor
+        self.monitor_key = monitor_key
+        self.profile = profile if profile is not None else ddc_profiler.monitor(monitor_key, getattr(monitor.vcp, "bus_number", None))
+        self.session = MonitorSession(monitor, profile=self.profile)
+        self.pending = collections.OrderedDict()  # ключ -> (job, callback)
+        self.condition = threading.Condition()
+        self.job_counter = itertools.count()
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name=f"ddc-{monitor_key}")
+        self.thread.daemon = True
+        self.thread.start()
+        
+    def submit(self, job, callback=None, key=None):
+        """Ставит задачу в очередь; job(session) выполняется в потоке монитора.
+        
+        Если задача с таким же key ещё ждет выполнения, она заменяется новой
+        (последнее значение побеждает) и сохраняет свое место в очереди.
+        """
+        with self.condition:
+            if key is None:
+                key = ("job", next(self.job_counter))
+            elif key in self.pending:
+                self.profile.add_coalesced()  # Промежуточное значение так и не попало на шину
+            self.pending[key] = (job, callback)
+            self.condition.notify()
+        
+    def stop(self):
+        """Останавливает поток после выполнения уже поставленных задач"""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        
+    def _run(self):
+        """Последовательно выполняет задачи, только этот поток обращается к шине монитора"""
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopping:
+                    if not self.session.is_open:
+                        self.condition.wait()
+                    elif self.session.idle_remaining() > 0:
+                        self.condition.wait(self.session.idle_remaining())
+                    else:
+                        self.session.close()
+                if not self.pending:
+                    self.session.close()
+                    break
+                _, (job, callback) = self.pending.popitem(last=False)
+            
+            start = time.perf_counter()
+            try:
+                result = job(self.session)
+            except Exception as e:
+                ddc_log.error("❌ Ошибка DDC задачи для %s: %s", self.monitor_key, e)
+                continue
+            finally:
+                self.profile.add_busy((time.perf_counter() - start) * 1000)
+            
+            if callback:
+                try:
+                    callback(result)
+                except Exception as e:
+                    ddc_log.warning("⚠️  Ошибка обработки результата для %s: %s", self.monitor_key, e)
+
+class DDCEngine:
+    """Фоновый движок DDC/CI: по одному рабочему потоку на каждый монитор, GUI поток не трогает шину I2C"""
+    
+    def __init__(self, ui_updater=None):
+        self.ui_updater = ui_updater
+        self.workers = {}
+        
+    def add_monitor(self, monitor_key, monitor, name=None):
+        """Создает рабочий поток для монитора (name - идентификатор монитора в статистике)"""
+        if monitor_key not in self.workers:
+            profile = ddc_profiler.monitor(name or monitor_key, getattr(monitor.vcp, "bus_number", None))
+            profile.transport = get_transport_name(monitor)
+            self.workers[monitor_key] = MonitorWorker(monitor, monitor_key, profile)
+        return self.workers[monitor_key]
+    
+    def remove_monitor(self, monitor_key):
+        """Останавливает рабочий поток монитора"""
+        worker = self.workers.pop(monitor_key, None)
+        if worker:
+            worker.stop()
+            
+    def submit(self, monitor_key, job, callback=None, key=None):
+        """Отправляет задачу чтения/записи в поток монитора (key - ключ объединения записей)"""
+        worker = self.workers.get(monitor_key)
+        if worker is None:
+            ddc_log.warning("⚠️  Нет рабочего потока для %s", monitor_key)
+            return False
+        worker.submit(job, callback, key)
+        return True
+    
+    def request_state(self, monitor_key, monitor_index, max_age_ms=SHADOW_MAX_AGE_MS):
+        """Читает яркость, вход и возможности монитора в фоне, результат приходит сигналом monitor_polled.
+        
+        Значения, записанные или прочитанные не раньше max_age_ms, берутся из теневого состояния.
+        """
+        def on_state(state):
+            if self.ui_updater:
+                self.ui_updater.monitor_polled.emit(monitor_key, state)
+        
+        return self.submit(monitor_key, lambda monitor: read_monitor_state(monitor, monitor_index, max_age_ms), on_state, key="state")
+    
+    def shutdown(self):
+        """Останавливает все рабочие потоки"""
+        for monitor_key in list(self.workers):
+            self.remove_monitor(monitor_key)
+    
+def to_perceptual(value, gamma):
+    """Значение кода VCP (0-100) -> воспринимаемая величина 0.0-1.0"""
+    return (max(0.0, min(100.0, value)) / 100.0) ** (1.0 / gamma)
+
+def from_perceptual(perceived, gamma):
+    """Воспринимаемая величина 0.0-1.0 -> значение кода VCP (0-100)"""
+    return 100.0 * max(0.0, min(1.0, perceived)) ** gamma
+
+class FeatureAnimator:
+    """Состояние плавного изменения одного кода VCP монитора (яркость, контраст) с адаптивным timing'ом.
+    
+    Кадры рассчитывает общий AnimationScheduler, а записи выполняются в потоке
+    DDC монитора (MonitorWorker) с объединением промежуточных значений.
+    """
+    
+    def __init__(self, monitor, monitor_name: str, ui_updater=None, worker=None, code=VCP_BRIGHTNESS):
         self.monitor = monitor
         self.monitor_name = monitor_name
+        self.feature = VCP_FEATURES_BY_CODE[code]
+        # Кадры яркости равномерны для глаза, остальные коды - по шкале значений
+        self.gamma = PERCEPTUAL_GAMMA if code == VCP_BRIGHTNESS else 1.0
         self.current_value = 50
+        self.start_value_read = False  # Значение на мониторе перед анимацией известно (прочитано)
         self.target_value = 50
         self.is_animating = False
+        self.is_starting = False  # Ждет чтения начального значения перед стартом
         self.lock = threading.Lock()
         self.ui_updater = ui_updater  # Объект для отправки сигналов
+        # Долгоживущий поток DDC монитора, в котором выполняются все записи
+        self.worker = worker if worker else MonitorWorker(monitor, monitor_name)
         
-        # Адаптивные параметры анимации
-        self.optimal_steps = DEFAULT_ANIMATION_STEPS
-        self.performance_history = []  # История производительности
-        self.last_step_duration_ms = 10  # Средняя длительность одного шага в мс
+        # Текущий отрезок анимации на общей шкале времени (под self.lock)
+        self.segment_id = 0
+        self.start_value = 50
+        self.end_value = 50
+        self.segment_start_time = 0.0
+        self.deadline = 0.0
+        self.next_frame_time = 0.0
+        self.keyframe_interval = 0.0  # Время, за которое изменение становится заметным (PERCEPTUAL_MIN_STEP)
+        self.last_submitted = None
+        self.last_written = None
+        self.animation_start_time = 0.0
+        self.writes = 0
+        
+        # Модель задержки записи: последние измерения записи кода в мс
+        self.performance_history = []
+        self.last_step_duration_ms = DEFAULT_WRITE_LATENCY_MS  # Оценка задержки одной записи
         
         # Загружаем сохраненные настройки
         self._load_settings()
         
+    @property
+    def settings_key(self):
+        """Ключ настроек: имя монитора для яркости (как раньше), имя и код для остальных"""
+        if self.feature.code == VCP_BRIGHTNESS:
+            return self.monitor_name
+        return f"{self.monitor_name} {self.feature.key}"
+        
     def _load_settings(self):
-        """Загружает сохраненные настройки производительности"""
-        try:
-            if os.path.exists(SETTINGS_FILE):
-                with open(SETTINGS_FILE, 'r') as f:
-                    settings = json.load(f)
-                    monitor_settings = settings.get(self.monitor_name, {})
-                    if monitor_settings:
-                        self.optimal_steps = monitor_settings.get('optimal_steps', DEFAULT_ANIMATION_STEPS)
-                        self.performance_history = monitor_settings.get('performance_history', [])[:3]  # Берем только последние 3
-                        print(f"📂 Загружены настройки для {self.monitor_name}: {self.optimal_steps} шагов, история: {self.performance_history}")
-        except Exception as e:
-            print(f"⚠️  Ошибка загрузки настроек: {e}")
+        """Загружает сохраненную модель задержки записи"""
+        monitor_settings = settings_store.get(self.settings_key)
+        if monitor_settings:
+            self.performance_history = monitor_settings.get('write_latency_history', [])[-LATENCY_HISTORY_SIZE:]
+            if self.performance_history:
+                self.last_step_duration_ms = self._estimate_write_latency()
+            elif 'step_latency_ms' in monitor_settings:
+                self.last_step_duration_ms = monitor_settings['step_latency_ms']
+            settings_log.debug("📂 Загружены настройки для %s: задержка записи %.1fms (%s измерений)",
+                               self.monitor_name, self.last_step_duration_ms, len(self.performance_history))
             
     def _save_settings(self):
-        """Сохраняет текущие настройки производительности"""
-        try:
-            settings = {}
-            if os.path.exists(SETTINGS_FILE):
-                with open(SETTINGS_FILE, 'r') as f:
-                    settings = json.load(f)
-            
-            settings[self.monitor_name] = {
-                'optimal_steps': self.optimal_steps,
-                'performance_history': self.performance_history[-3:]  # Сохраняем только последние 3
-            }
+        """Сохраняет модель задержки записи (в память, на диск ее запишет SettingsStore)"""
+        settings_store.put(self.settings_key, {
+            'write_latency_history': [round(latency, 2) for latency in self.performance_history],
+            'step_latency_ms': round(self.last_step_duration_ms, 2)
+        })
             
-            with open(SETTINGS_FILE, 'w') as f:
-                json.dump(settings, f, indent=2)
-            print(f"💾 Настройки сохранены для {self.monitor_name}")
-        except Exception as e:
-            print(f"⚠️  Ошибка сохранения настроек: {e}")
-        
-    def _calculate_optimal_steps(self, distance):
-        """Вычисляет оптимальное количество шагов на основе истории производительности"""
-        if len(self.performance_history) < 2:
-            print(f"📈 Недостаточно данных для адаптации, используем {self.optimal_steps} шагов")
-            return self.optimal_steps
-        
-        # Берем среднее время за последние 3 анимации
-        recent_times = self.performance_history[-3:]
-        avg_duration = sum(recent_times) / len(recent_times)
-        
-        print(f"📊 Анализ производительности: среднее время {avg_duration:.1f}ms, цель {TARGET_ANIMATION_DURATION_MS}ms")
-        
-        # Если анимация слишком медленная, уменьшаем количество шагов
-        if avg_duration > TARGET_ANIMATION_DURATION_MS + ANIMATION_TOLERANCE_MS:
-            new_steps = max(MIN_ANIMATION_STEPS, int(self.optimal_steps * 0.75))
-            print(f"⚡ Уменьшаем шаги: {self.optimal_steps} → {new_steps} (медленно: {avg_duration:.1f}ms > {TARGET_ANIMATION_DURATION_MS + ANIMATION_TOLERANCE_MS}ms)")
-            self.optimal_steps = new_steps
-            self._save_settings()  # Сохраняем изменения
-        # Если анимация слишком быстрая, увеличиваем количество шагов
-        elif avg_duration < TARGET_ANIMATION_DURATION_MS - ANIMATION_TOLERANCE_MS:
-            new_steps = min(MAX_ANIMATION_STEPS, int(self.optimal_steps * 1.25))
-            print(f"⚡ Увеличиваем шаги: {self.optimal_steps} → {new_steps} (быстро: {avg_duration:.1f}ms < {TARGET_ANIMATION_DURATION_MS - ANIMATION_TOLERANCE_MS}ms)")
-            self.optimal_steps = new_steps
-            self._save_settings()  # Сохраняем изменения
-        else:
-            print(f"✅ Производительность в норме: {avg_duration:.1f}ms, оставляем {self.optimal_steps} шагов")
+    def _record_write_latency(self, latency_ms):
+        """Добавляет измерение задержки записи в модель"""
+        self.performance_history.append(latency_ms)
+        if len(self.performance_history) > LATENCY_HISTORY_SIZE:
+            self.performance_history.pop(0)
+            
+    def _estimate_write_latency(self):
+        """Оценка задержки записи: 90-й перцентиль последних измерений (с запасом на выбросы)"""
+        if not self.performance_history:
+            return self.last_step_duration_ms
+        ordered = sorted(self.performance_history)
+        return ordered[int(0.9 * (len(ordered) - 1))]
         
-        return self.optimal_steps
+    def rename(self, monitor_name: str):
+        """Меняет имя аниматора (ключ настроек) и загружает сохраненные для него настройки"""
+        if monitor_name and monitor_name != self.monitor_name:
+            self.monitor_name = monitor_name
+            self._load_settings()
         
-    def set_target(self, value: int):
-        """Устанавливает новое целевое значение яркости"""
+    def stop(self):
+        """Прекращает анимацию: дальше значение задает не аниматор (например, сцена)"""
+        animation_scheduler.cancel(self)
         with self.lock:
-            self.target_value = value
-            print(f"🎯 Цель яркости для {self.monitor_name}: {value}%")
+            # Завершение уже отправленного последнего кадра относится к старому отрезку и будет проигнорировано
+            self.segment_id += 1
+            self.is_animating = False
+            self.is_starting = False
+            self.last_submitted = None
+        
+    def set_target(self, value: int):
+        """Устанавливает новое целевое значение (не блокирует вызывающий поток)"""
+        animation_log.debug("🎯 Цель %s для %s: %s%%", self.feature.key, self.monitor_name, value)
+        animation_scheduler.animate([self], value)
             
-            if not self.is_animating:
-                try:
-                    with self.monitor:
-                        current_brightness = self.monitor.get_luminance()
-                        if current_brightness is not None:
-                            self.current_value = current_brightness
-                            print(f"📊 Текущая яркость: {self.current_value}%")
-                        else:
-                            print(f"⚠️  Яркость не получена (None), используем значение по умолчанию: {self.current_value}%")
-                except Exception as e:
-                    print(f"⚠️  Ошибка получения яркости: {e}")
-                    self.current_value = 50
-                
-                self.is_animating = True
-                thread = threading.Thread(target=self._animate)
-                thread.daemon = True
-                thread.start()
+    def _read_start_value(self, monitor):
+        """Читает текущее значение перед началом анимации (выполняется в потоке DDC).
+        
+        После недавней записи или чтения значение берется из теневого состояния без обращения к шине.
+        """
+        try:
+            with monitor:
+                current, _ = monitor.vcp.get_vcp_feature(self.feature.code)
+                self.start_value_read = current is not None
+                if current is not None:
+                    self.current_value = current
+                    animation_log.debug("📊 Текущее значение %s: %s%%", self.feature.key, self.current_value)
+                else:
+                    animation_log.warning("⚠️  Значение %s не получено (None), используем значение по умолчанию: %s%%",
+                                          self.feature.key, self.current_value)
+        except Exception as e:
+            animation_log.warning("⚠️  Ошибка получения %s: %s", self.feature.key, e)
+            self.start_value_read = False
+            self.current_value = 50
     
-    def _animate(self):
-        """Основной цикл анимации с адаптивным timing'ом"""
-        import time as time_module
+    def _begin_segment(self, start_time, deadline):
+        """Начинает отрезок анимации от текущего значения к цели (вызывается планировщиком)"""
+        with self.lock:
+            if self.current_value is None:
+                animation_log.warning("⚠️  Начальное значение %s None, используем 50%%", self.feature.key)
+                self.current_value = 50
+            if self.is_starting:
+                # Новая анимация, а не смена цели текущей: значение могли изменить кнопками монитора,
+                # поэтому на мониторе - только что прочитанное значение (если прочитать не удалось - неизвестно)
+                self.is_starting = False
+                self.animation_start_time = start_time
+                self.last_written = self.current_value if self.start_value_read else None
+                self.last_submitted = self.last_written
+            self.segment_id += 1
+            self.start_value = self.current_value
+            self.end_value = self.target_value
+            self.segment_start_time = start_time
+            self.deadline = deadline
+            self.next_frame_time = start_time
+            # Кадры ставим там, где изменение станет заметным, а не на каждом шаге значения
+            distance = abs(to_perceptual(self.end_value, self.gamma) - to_perceptual(self.start_value, self.gamma))
+            self.keyframe_interval = (deadline - start_time) * min(1.0, PERCEPTUAL_MIN_STEP / distance) if distance else 0.0
+            animation_log.debug("🎬 Анимация %s: %s%% → %s%% (ожидаемая задержка записи %.1fms)",
+                                self.monitor_name, self.start_value, self.end_value, self._estimate_write_latency())
+    
+    def _frame_interval(self):
+        """Кадры не чаще, чем шина успевает их записать, и не чаще MAX_ANIMATION_STEPS за анимацию.
         
-        animation_start_time = time_module.time()
-        print(f"🎬 Начинаем анимацию для {self.monitor_name}")
+        Нестабильному монитору кадры идут реже (MonitorHealth.pacing): меньше записей - меньше отказов.
+        """
+        interval_ms = max(TARGET_ANIMATION_DURATION_MS / MAX_ANIMATION_STEPS, self._estimate_write_latency())
+        return interval_ms * self.worker.session.health.pacing() / 1000.0
         
-        # Запоминаем начальное значение и вычисляем общее расстояние
-        start_value = self.current_value
+    def _tick(self, now):
+        """Рассчитывает кадр на момент now и отправляет запись в поток монитора.
         
-        # Проверяем, что start_value не None
-        if start_value is None:
-            print(f"⚠️  Начальное значение яркости None, используем 50%")
-            start_value = 50
-            self.current_value = 50
+        Значение считается по прошедшему времени, поэтому при медленной шине
+        промежуточные значения пропускаются. Последняя запись стартует заранее
+        (на оценку задержки записи), чтобы завершиться к общему дедлайну.
+        Возвращает True, когда отправлено конечное значение.
+        """
+        with self.lock:
+            if now < self.next_frame_time:
+                return False
+            
+            lead = self._estimate_write_latency() / 1000.0
+            final_start_time = self.deadline - lead
+            finished = now >= final_start_time
+            
+            if not finished and final_start_time - now < lead:
+                # Промежуточная запись задержала бы последнюю - ждем момента последней записи
+                self.next_frame_time = final_start_time
+                return False
+            
+            if finished:
+                # На последнем кадре точно устанавливаем целевое значение
+                self.current_value = self.end_value
+            else:
+                # Прогресс по реальному времени от 0.0 до 1.0, значение - равномерно по восприятию
+                progress = (now - self.segment_start_time) / (final_start_time - self.segment_start_time)
+                start = to_perceptual(self.start_value, self.gamma)
+                end = to_perceptual(self.end_value, self.gamma)
+                self.current_value = round(from_perceptual(start + (end - start) * progress, self.gamma))
+            value = self.current_value
+            segment_id = self.segment_id
+            # Редкие ключевые кадры не должны отодвинуть последнюю запись
+            self.next_frame_time = min(now + max(self._frame_interval(), self.keyframe_interval), max(now, final_start_time))
+            
+            # Значение, которое уже на мониторе (или уже отправлено), повторно не пишем
+            if value == self.last_submitted and not finished:
+                return False
+            self.last_submitted = value
         
-        total_distance = abs(self.target_value - start_value)
+        # Запись с ключом кода: если поток ещё не записал предыдущий кадр, тот будет заменен
+        self.worker.submit(lambda monitor: self._write_frame(monitor, value, finished, segment_id), key=self.feature.key)
+        return finished
+    
+    def _write_frame(self, monitor, value, finished, segment_id):
+        """Записывает кадр на шину и обновляет модель задержки (выполняется в потоке DDC)"""
+        if value != self.last_written:
+            try:
+                with monitor:
+                    write_start_time = time.perf_counter()
+                    # Конечное значение проверяем чтением: промежуточные все равно перезапишутся
+                    monitor.vcp.set_vcp_feature(self.feature.code, value, verify=finished and DDC_VERIFY_FINAL_WRITE)
+                    # В модель задержки идет только сама запись - без проверочного чтения и повторов
+                    latency_ms = getattr(monitor, "last_attempt_ms", None)
+                    if latency_ms is None:
+                        latency_ms = (time.perf_counter() - write_start_time) * 1000
+            except Exception as e:
+                if not finished and classify_ddc_error(e) == "transient":
+                    # Повторы не помогли - пропускаем кадр, следующий кадр запишет более новое значение
+                    animation_log.warning("⚠️  Кадр %s %s%% для %s пропущен: %s", self.feature.key, value, self.monitor_name, e)
+                    with self.lock:
+                        if self.last_submitted == value:
+                            self.last_submitted = None
+                    return
+                animation_log.error("❌ Ошибка установки %s: %s", self.feature.key, e)
+                animation_scheduler.cancel(self)
+                with self.lock:
+                    self.is_animating = False
+                    self.last_submitted = None
+                return
+            
+            self._record_write_latency(latency_ms)
+            self.last_written = value
+            self.writes += 1
+            animation_log.debug("%s %s установлено: %s%% (кадр %s, %.1fms)", self.feature.emoji, self.feature.key, value, self.writes, latency_ms)
+            
+            # Обновляем иконку яркости каждые несколько кадров или на последнем
+            if self.ui_updater and self.feature.code == VCP_BRIGHTNESS and (self.writes % 5 == 0 or finished):
+                self.ui_updater.update_icon.emit(value)
+        
+        if not finished:
+            return
         
-        # Если расстояние 0, то анимация не нужна
-        if total_distance == 0:
+        with self.lock:
+            # За время записи могла начаться новая анимация
+            if segment_id != self.segment_id:
+                return
             self.is_animating = False
-            print(f"✅ Анимация не требуется: уже {self.current_value}%")
+            writes = self.writes
+            self.writes = 0
+            self.last_submitted = None
+        
+        actual_duration = (time.perf_counter() - self.animation_start_time) * 1000
+        self.last_step_duration_ms = self._estimate_write_latency()
+        animation_log.debug("✅ Анимация завершена: %s%% за %.1fms (цель %sms, %s записей, задержка записи %.1fms)",
+                            value, actual_duration, TARGET_ANIMATION_DURATION_MS, writes, self.last_step_duration_ms)
+        if abs(actual_duration - TARGET_ANIMATION_DURATION_MS) > ANIMATION_TOLERANCE_MS:
+            animation_log.debug("⚠️  Длительность анимации вне допуска ±%sms", ANIMATION_TOLERANCE_MS)
+        
+        # Сохраняем модель задержки после каждой анимации
+        self._save_settings()
+        self.worker.profile.record_animation(self.feature.key, actual_duration, writes)
+        
+        # Конечное значение известно - обновляем состояние без чтения с шины
+        if self.ui_updater:
+            self.ui_updater.monitor_state.emit(self.worker.monitor_key, {self.feature.key: value})
+
+class AnimationScheduler:
+    """Общие часы анимации: один поток рассчитывает кадры всех мониторов.
+    
+    Мониторы, запущенные вместе, получают одно время начала и один дедлайн,
+    а записи уходят параллельно - каждая в поток своего монитора (своей шины).
+    """
+    
+    def __init__(self):
+        self.active = set()
+        self.condition = threading.Condition()
+        self.thread = None
+        
+    def animate(self, animators, value):
+        """Запускает синхронную анимацию группы мониторов к значению value"""
+        starting = []
+        running = []
+        for animator in animators:
+            with animator.lock:
+                animator.target_value = value
+                if animator.is_starting:
+                    # Старт уже запрошен, новая цель будет взята при старте
+                    continue
+                if animator.is_animating:
+                    running.append(animator)
+                else:
+                    animator.is_animating = True
+                    animator.is_starting = True
+                    starting.append(animator)
+        
+        if not starting:
+            if running:
+                self._begin(running)
             return
         
-        # Вычисляем оптимальное количество шагов
-        animation_steps = self._calculate_optimal_steps(total_distance)
-        step_delay_ms = TARGET_ANIMATION_DURATION_MS / animation_steps
+        group = starting + running
         
-        print(f"📏 Расстояние анимации: {start_value}% → {self.target_value}% (Δ={total_distance})")
-        print(f"⚡ Адаптивные параметры: {animation_steps} шагов по {step_delay_ms:.1f}ms")
-        print(f"🎯 Целевая длительность: {TARGET_ANIMATION_DURATION_MS}ms (±{ANIMATION_TOLERANCE_MS}ms)")
+        # Перед стартом читаем текущее значение, параллельно на всех шинах;
+        # группа стартует одновременно, когда прочитаны все значения
+        remaining = [len(starting)]
+        remaining_lock = threading.Lock()
         
-        step_count = 0
-        while self.is_animating and step_count < animation_steps:
-            with self.lock:
-                step_count += 1
-                
-                # Вычисляем прогресс от 0.0 до 1.0
-                progress = step_count / animation_steps
+        def on_start_value(_):
+            with remaining_lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                self._begin(group)
+        
+        for animator in starting:
+            animator.worker.submit(animator._read_start_value, on_start_value, key=f"{animator.feature.key}-start")
+            
+    def _begin(self, animators):
+        """Начинает отрезки анимации группы на общей шкале времени"""
+        start_time = time.perf_counter()
+        deadline = start_time + TARGET_ANIMATION_DURATION_MS / 1000.0
+        with self.condition:
+            for animator in animators:
+                if not animator.is_animating:
+                    continue  # Остановлен, пока читалось начальное значение
+                animator._begin_segment(start_time, deadline)
+                self.active.add(animator)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="animation-clock")
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+    
+    def cancel(self, animator):
+        """Прекращает анимацию монитора (например, после ошибки записи)"""
+        with self.condition:
+            self.active.discard(animator)
+    
+    def _run(self):
+        """Тикает все активные анимации по общим часам"""
+        while True:
+            with self.condition:
+                while not self.active:
+                    self.condition.wait()
                 
-                # Интерполируем между начальным и целевым значением
-                interpolated_value = start_value + (self.target_value - start_value) * progress
-                self.current_value = round(interpolated_value)
+                now = time.perf_counter()
+                for animator in list(self.active):
+                    if animator._tick(now):
+                        self.active.discard(animator)
                 
-                # На последнем шаге точно устанавливаем целевое значение
-                if step_count >= animation_steps:
-                    self.current_value = self.target_value
-                    self.is_animating = False
-                    
-                    animation_end_time = time_module.time()
-                    actual_duration = (animation_end_time - animation_start_time) * 1000
-                    
-                    # Сохраняем результат в историю производительности
-                    self.performance_history.append(actual_duration)
-                    if len(self.performance_history) > 5:  # Храним только последние 5 результатов
-                        self.performance_history.pop(0)
-                    
-                    # Сохраняем настройки после каждой анимации
-                    self._save_settings()
-                    
-                    print(f"✅ Анимация завершена: {self.current_value}% за {actual_duration:.1f}ms")
-                    print(f"📊 История производительности: {[f'{t:.0f}ms' for t in self.performance_history[-3:]]}")
-                    
-                    if self.ui_updater:
-                        self.ui_updater.request_update()
+                if self.active:
+                    wake_time = min(animator.next_frame_time for animator in self.active)
+                    self.condition.wait(max(0.0, wake_time - time.perf_counter()))
+
+def write_json_atomic(path, data):
+    """Записывает JSON через временный файл и rename: читатели видят либо старый, либо новый файл целиком"""
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+class SettingsStore:
+    """Настройки в памяти с отложенной пакетной записью на диск.
+    
+    put() только меняет словарь в памяти и помечает ключ измененным, поэтому
+    на пути анимации нет дискового ввода-вывода. Измененные ключи записываются
+    не чаще раза в flush_delay_ms и при выходе. Запись атомарная, а между
+    процессами сериализуется flock: файл перечитывается под блокировкой и
+    заменяются только свои ключи, чтобы не затереть чужие изменения.
+    """
+    
+    def __init__(self, path, flush_delay_ms=SETTINGS_FLUSH_DELAY_MS):
+        self.path = path
+        self.flush_delay_ms = flush_delay_ms
+        self.entries = None  # Загружается при первом обращении
+        self.dirty = set()
+        self.flush_timer = None
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        
+    def _read_file(self):
+        """Читает файл настроек; поврежденный или отсутствующий файл - пустые настройки"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            settings_log.warning("⚠️  Ошибка загрузки настроек: %s", e)
+        return {}
+        
+    def _ensure_loaded(self):
+        """Загружает настройки с диска (вызывается под блокировкой)"""
+        if self.entries is None:
+            self.entries = self._read_file()
+            
+    def get(self, key, default=None):
+        """Возвращает копию сохраненного значения"""
+        with self.lock:
+            self._ensure_loaded()
+            value = self.entries.get(key, default)
+            return json.loads(json.dumps(value)) if value is not None else value
+        
+    def put(self, key, value):
+        """Сохраняет значение в памяти и планирует запись на диск"""
+        with self.lock:
+            self._ensure_loaded()
+            self.entries[key] = value
+            self.dirty.add(key)
+            # Таймер не перезапускается: при частых изменениях запись все равно произойдет через flush_delay_ms
+            if self.flush_timer is None:
+                self.flush_timer = threading.Timer(self.flush_delay_ms / 1000.0, self.flush)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
                 
-                try:
-                    # Проверяем, что current_value не None перед установкой
-                    if self.current_value is None:
-                        print(f"⚠️  current_value is None, устанавливаем значение по умолчанию")
-                        self.current_value = self.target_value
-                    
-                    with self.monitor:
-                        self.monitor.set_luminance(self.current_value)
-                        print(f"🔆 Яркость установлена: {self.current_value}% (шаг {step_count}/{animation_steps})")
-                        
-                        # Обновляем иконку каждые несколько шагов или на последнем шаге
-                        if self.ui_updater and (step_count % max(1, animation_steps // 5) == 0 or step_count >= animation_steps):
-                            self.ui_updater.update_icon.emit(self.current_value)
-                        
-                except Exception as e:
-                    print(f"❌ Ошибка установки яркости: {e}")
-                    self.is_animating = False
-                    break
-                    
-            # Если анимация ещё продолжается, ждём до следующего шага
-            if self.is_animating:
-                time.sleep(step_delay_ms / 1000.0)
+    def flush(self):
+        """Записывает измененные ключи на диск (по таймеру и при выходе)"""
+        # Диск пишем вне self.lock, чтобы put() из потоков DDC не ждал ввода-вывода
+        with self.flush_lock:
+            with self.lock:
+                if self.flush_timer is not None:
+                    self.flush_timer.cancel()
+                    self.flush_timer = None
+                if not self.dirty:
+                    return
+                changes = {key: self.entries[key] for key in self.dirty}
+                self.dirty.clear()
+            
+            try:
+                with open(self.path + ".lock", 'w') as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    settings = self._read_file()
+                    settings.update(changes)
+                    write_json_atomic(self.path, settings)
+                settings_log.debug("💾 Настройки сохранены: %s", ', '.join(changes))
+            except Exception as e:
+                # Не потеряем изменения - попробуем при следующей записи
+                with self.lock:
+                    self.dirty.update(changes)
+                settings_log.warning("⚠️  Ошибка сохранения настроек: %s", e)
+
+class CapabilitiesCache:
+    """Кэш возможностей мониторов в памяти и на диске.
+    
+    Строка возможностей - самая медленная операция DDC/CI и не меняется для
+    конкретной панели, поэтому она читается один раз на монитор (по EDID) и
+    переиспользуется между запусками. Мониторы без EDID (идентификатор по шине)
+    хранятся только в памяти до следующего сканирования: на ту же шину могли
+    подключить другую панель.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.entries = None  # Загружается при первом обращении
+        self.lock = threading.Lock()
+        
+    def _ensure_loaded(self):
+        """Загружает кэш с диска (вызывается под блокировкой)"""
+        if self.entries is not None:
+            return
+        self.entries = {}
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    for identity, caps in json.load(f).items():
+                        if is_bus_identity(identity):
+                            continue  # Записано старой версией - панель на шине могла смениться
+                        # JSON хранит ключи словаря строками
+                        caps["vcp"] = {int(code): values for code, values in caps.get("vcp", {}).items()}
+                        self.entries[identity] = caps
+                settings_log.info("📂 Загружен кэш возможностей: %s мониторов", len(self.entries))
+        except Exception as e:
+            settings_log.warning("⚠️  Ошибка загрузки кэша возможностей: %s", e)
+            
+    def _save(self):
+        """Сохраняет кэш на диск (вызывается под блокировкой)"""
+        try:
+            write_json_atomic(self.path, {identity: caps for identity, caps in self.entries.items() if not is_bus_identity(identity)})
+        except Exception as e:
+            settings_log.warning("⚠️  Ошибка сохранения кэша возможностей: %s", e)
+            
+    def get(self, identity):
+        """Возвращает возможности монитора или None, если их нужно прочитать"""
+        with self.lock:
+            self._ensure_loaded()
+            return self.entries.get(identity)
+        
+    def put(self, identity, capabilities):
+        """Запоминает возможности монитора"""
+        with self.lock:
+            self._ensure_loaded()
+            self.entries[identity] = capabilities
+            self._save()
+            
+    def invalidate(self, identity=None):
+        """Сбрасывает кэш одного монитора или всех (при горячем подключении или пересканировании)"""
+        with self.lock:
+            self._ensure_loaded()
+            if identity is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(identity, None)
+            self._save()
+        g_monitor_identities.clear()
+        
+    def forget_bus_identities(self):
+        """Забывает возможности мониторов без EDID (перед сканированием)"""
+        with self.lock:
+            self._ensure_loaded()
+            for identity in [identity for identity in self.entries if is_bus_identity(identity)]:
+                del self.entries[identity]
+
+def normalize_capabilities(capabilities):
+    """Приводит словарь monitorcontrol к виду, пригодному для JSON (перечисления -> int)"""
+    capabilities = capabilities or {}
+    vcp = capabilities.get("vcp") or {}
+    return {
+        "model": capabilities.get("model") or None,
+        "inputs": [int(code) for code in (capabilities.get("inputs") or [])],
+        "vcp": {int(code): sorted(int(value) for value in (values or {})) for code, values in vcp.items()},
+    }
+
+def read_edid(bus_number):
+    """Читает EDID монитора на шине i2c-N из sysfs DRM (без обращения к шине)"""
+    bus_name = f"i2c-{bus_number}"
+    for connector in glob.glob("/sys/class/drm/card*-*"):
+        ddc_link = os.path.join(connector, "ddc")
+        if os.path.basename(os.path.realpath(ddc_link)) != bus_name and not os.path.isdir(os.path.join(connector, bus_name)):
+            continue
+        try:
+            with open(os.path.join(connector, "edid"), 'rb') as f:
+                edid = f.read()
+        except OSError:
+            continue
+        if edid:
+            return edid
+    return None
+
+def parse_edid(edid):
+    """Извлекает производителя, код продукта, серийный номер и имя модели из EDID"""
+    if not edid or len(edid) < 128 or edid[:8] != b"\x00\xff\xff\xff\xff\xff\xff\x00":
+        return None
+    
+    # Код производителя - три буквы по 5 бит
+    manufacturer_raw = (edid[8] << 8) | edid[9]
+    manufacturer = "".join(chr(((manufacturer_raw >> shift) & 0x1F) + ord("A") - 1) for shift in (10, 5, 0))
+    product = edid[10] | (edid[11] << 8)
+    serial = int.from_bytes(edid[12:16], "little")
+    
+    # Текстовые дескрипторы: 0xFC - имя модели, 0xFF - серийный номер
+    name = None
+    serial_text = None
+    for offset in (54, 72, 90, 108):
+        descriptor = edid[offset:offset + 18]
+        if descriptor[0:3] != b"\x00\x00\x00":
+            continue
+        text = descriptor[5:18].split(b"\x0a")[0].decode("ascii", "replace").strip()
+        if descriptor[3] == 0xFC:
+            name = text
+        elif descriptor[3] == 0xFF:
+            serial_text = text
+    
+    return {
+        "manufacturer": manufacturer,
+        "product": product,
+        "serial": serial_text or str(serial),
+        "name": name,
+    }
+
+def get_i2c_buses():
+    """Номера шин /dev/i2c-N"""
+    buses = []
+    for path in glob.glob("/dev/i2c-*"):
+        suffix = path.rsplit("-", 1)[-1]
+        if suffix.isdigit():
+            buses.append(int(suffix))
+    return sorted(buses)
+
+def get_edid_identity(bus_number):
+    """Идентификатор из EDID монитора на шине (производитель-модель-серийный номер) или None"""
+    edid_info = parse_edid(read_edid(bus_number))
+    if not edid_info:
+        return None
+    return f"{edid_info['manufacturer']}-{edid_info['product']:04X}-{edid_info['serial']}"
+
+def is_bus_identity(identity):
+    """Идентификатор по номеру шины, а не по EDID: какая панель на шине - неизвестно"""
+    return identity.startswith(("i2c-", "monitor-"))
+
+def get_monitor_identity(monitor, monitor_index=None):
+    """Возвращает стабильный идентификатор монитора (производитель-модель-серийный номер).
+    
+    У одинаковых мониторов без серийного номера в EDID идентификаторы совпадают - монитор
+    на шине с большим номером получает суффикс шины (DEL-1234-0@i2c-7). Суффикс зависит
+    только от номеров шин, а не от порядка опроса.
+    """
+    bus_number = getattr(getattr(monitor, "vcp", None), "bus_number", None)
+    if bus_number is None:
+        return f"monitor-{monitor_index}"
+    
+    if bus_number not in g_monitor_identities:
+        identity = get_edid_identity(bus_number)
+        if identity is None:
+            identity = f"i2c-{bus_number}"
+        elif any(get_edid_identity(other) == identity for other in get_i2c_buses() if other < bus_number):
+            identity = f"{identity}@i2c-{bus_number}"
+        g_monitor_identities[bus_number] = identity
+    return g_monitor_identities[bus_number]
+
+class VCPFeature:
+    """Управляемый код VCP: одно описание для чтения, записи, анимации, API и пунктов меню.
+    
+    Непрерывные коды (яркость, контраст, громкость) показываются пресетами,
+    коды-перечисления (вход, цветовой режим) - списком значений из строки возможностей.
+    """
+    
+    def __init__(self, code, key, title, emoji, presets=(), preset_format=None, animated=False, names=None):
+        self.code = code
+        self.key = key                      # Поле MonitorState и параметр API
+        self.title = title
+        self.emoji = emoji
+        self.presets = presets              # [(эмодзи, значение)] для непрерывных кодов
+        self.preset_format = preset_format  # Текст пункта пресета
+        self.animated = animated            # Изменяется плавно через FeatureAnimator
+        self.names = names                  # Названия значений для перечислений
+        
+    @property
+    def is_choice(self):
+        return self.names is not None
+    
+    def value_name(self, value):
+        """Название значения перечисления"""
+        if self.code == VCP_INPUT_SOURCE:
+            return get_input_name(value)
+        return self.names.get(value, f"{self.title} {value}")
+    
+    def resolve_choice(self, value):
+        """Значение перечисления по числу или названию (без учета регистра и дефисов)"""
+        if self.code == VCP_INPUT_SOURCE:
+            return monitor_ipc.resolve_input_code(value)
+        if isinstance(value, int) or str(value).isdigit():
+            return int(value)
+        wanted = str(value).lower().replace("-", "").replace(" ", "")
+        for code, name in self.names.items():
+            if name.lower().replace("-", "").replace(" ", "") == wanted:
+                return code
+        raise ValueError(f"неизвестное значение {self.key}: {value}")
+
+# Коды VCP, которыми управляет приложение (в порядке пунктов меню)
+VCP_FEATURES = [
+    VCPFeature(VCP_BRIGHTNESS, "brightness", "Яркость", "🔆",
+               presets=[("🌑", 0), ("🌘", 25), ("🌗", 50), ("🌖", 75), ("🌕", 100)],
+               preset_format="   {emoji} {value}%", animated=True),
+    VCPFeature(VCP_CONTRAST, "contrast", "Контраст", "◐",
+               presets=[("◔", 25), ("◑", 50), ("◕", 75), ("●", 100)],
+               preset_format="   {emoji} Контраст {value}%", animated=True),
+    VCPFeature(VCP_AUDIO_VOLUME, "volume", "Громкость", "🔊",
+               presets=[("🔇", 0), ("🔈", 25), ("🔉", 50), ("🔊", 100)],
+               preset_format="   {emoji} Громкость {value}%"),
+    VCPFeature(VCP_COLOR_PRESET, "color_preset", "Цветовой режим", "🎨", names=COLOR_PRESET_NAMES),
+    VCPFeature(VCP_INPUT_SOURCE, "input", "Источники входа", "🔌", names=monitor_ipc.INPUT_NAMES),
+]
+VCP_FEATURES_BY_CODE = {feature.code: feature for feature in VCP_FEATURES}
+VCP_FEATURES_BY_KEY = {feature.key: feature for feature in VCP_FEATURES}
+# Поля состояния, изменение которых при опросе означает действие пользователя кнопками монитора
+USER_CHANGE_KEYS = frozenset(feature.key for feature in VCP_FEATURES)
+# Без строки возможностей показываем то же, что и раньше: яркость, громкость и входы
+DEFAULT_FEATURE_CODES = (VCP_BRIGHTNESS, VCP_AUDIO_VOLUME, VCP_INPUT_SOURCE)
+
+def get_supported_features(capabilities):
+    """Функции монитора по строке возможностей; яркость и вход доступны всегда"""
+    declared = (capabilities or {}).get("vcp")
+    if not declared:
+        return [feature for feature in VCP_FEATURES if feature.code in DEFAULT_FEATURE_CODES]
+    return [feature for feature in VCP_FEATURES
+            if feature.code in declared or feature.code in (VCP_BRIGHTNESS, VCP_INPUT_SOURCE)]
+
+def get_feature_choices(feature, capabilities, state):
+    """Допустимые значения перечисления: входы из состояния, остальное из строки возможностей"""
+    if feature.code == VCP_INPUT_SOURCE:
+        return list(state.inputs or [])
+    return list(((capabilities or {}).get("vcp") or {}).get(feature.code) or [])
+
+class MonitorState:
+    """Известное состояние монитора с отслеживанием изменений"""
+    
+    FIELDS = tuple(feature.key for feature in VCP_FEATURES) + ("inputs", "model")
+    
+    def __init__(self, model=None):
+        # Значения кодов VCP (brightness, contrast, volume, color_preset, input)
+        for feature in VCP_FEATURES:
+            setattr(self, feature.key, None)
+        self.inputs = []
+        self.model = model
+        self.updated_at = 0.0  # time.monotonic() последнего чтения или нашей записи
+        
+    def update(self, values):
+        """Применяет новые значения и возвращает множество изменившихся полей"""
+        changed = set()
+        for field in self.FIELDS:
+            if field in values and values[field] != getattr(self, field):
+                setattr(self, field, values[field])
+                changed.add(field)
+        self.updated_at = time.monotonic()
+        return changed
+    
+    def is_stale(self, max_age_ms):
+        """Пора ли перечитать состояние с шины"""
+        return (time.monotonic() - self.updated_at) * 1000 >= max_age_ms
 
 def scan_monitors():
     """Сканирует мониторы (импорт ВНУТРИ функции)"""
     try:
-        print("Импортируем monitorcontrol...")
+        ddc_log.debug("Импортируем monitorcontrol...")
         import monitorcontrol
-        print("✅ monitorcontrol импортирован")
+        ddc_log.debug("✅ monitorcontrol импортирован")
         
-        print("Сканируем мониторы...")
-        monitors = monitorcontrol.get_monitors()
-        print(f"✅ Найдено мониторов: {len(monitors)}")
+        simulate = monitor_sim.get_spec()
+        if simulate:
+            # Имитированные мониторы вместо шин I2C (проверка без железа)
+            ddc_log.debug("Создаем имитированные мониторы (%s)...", simulate)
+            monitors = monitor_sim.get_monitors(simulate)
+        else:
+            ddc_log.debug("Сканируем мониторы...")
+            monitors = monitorcontrol.get_monitors()
+        ddc_log.info("✅ Найдено мониторов: %s", len(monitors))
         return monitors
     except Exception as e:
-        print(f"❌ Ошибка: {e}")
-        traceback.print_exc()
+        ddc_log.error("❌ Ошибка: %s", e, exc_info=True)
         return []
 
 # Глобальные переменные для управления мониторами
-animators = []
-update_timer = None
+animators = {} # Аниматоры по ключу монитора: код VCP -> FeatureAnimator (яркость создается при подключении)
+poll_scheduler_global = None
+hotplug_watcher_global = None
+screen_lock_watcher_global = None
+stats_timer_global = None
+ipc_server_global = None
 tray_icon_global = None
 monitors_global = []
 ui_updater_global = None
+ddc_engine_global = None
+ddc_transport_global = DDC_TRANSPORT  # Транспорт для мониторов, найденных при сканировании (--transport)
+g_monitors = {} # Подключенные мониторы: ключ -> монитор, номер и идентификатор
 g_menu_items = {} # Глобальный словарь для хранения элементов меню
+g_state_waiters = {} # Запросы API, ждущие свежего чтения монитора: ключ -> [callback(monitor_key)]
+g_monitor_states = {} # Известное состояние каждого монитора (MonitorState)
+g_tray_icon_level = None # Уровень яркости, показанный иконкой трея
+g_monitor_identities = {} # Идентификаторы мониторов по номеру шины I2C
+g_menu_layout = {} # Общие пункты меню (вне разделов мониторов)
+g_rescan_running = False # Идет фоновое пересканирование мониторов
+g_rescan_pending = None # Запрос сканирования во время идущего: None - нет, иначе reread_capabilities
+g_probing_buses = set() # Шины I2C, опрос которых при сканировании еще идет (возможно, завис)
+g_scene_errors = {} # Сцены из настроек с ошибками: имя -> ошибка (о которой уже предупредили)
+capabilities_cache = CapabilitiesCache(CAPABILITIES_FILE)
+settings_store = SettingsStore(SETTINGS_FILE)
+ddc_profiler = DDCProfiler()
+animation_scheduler = AnimationScheduler()
+
+def refresh_monitors(tray_icon=None, reread_capabilities=False):
+    """Пересканирует мониторы в фоне; меню обновится по сигналу monitors_scanned.
+    
+    При горячем подключении возможности берутся из кэша, по пункту меню
+    (reread_capabilities=True) кэш сбрасывается и возможности перечитываются.
+    Запрос во время идущего сканирования не теряется: сканирование повторится,
+    когда текущее применится (apply_monitor_scan).
+    """
+    global g_rescan_running, g_rescan_pending
+    
+    if g_rescan_running:
+        ddc_log.info("🔄 Сканирование мониторов уже выполняется, повторим после него")
+        g_rescan_pending = bool(g_rescan_pending) or reread_capabilities
+        return
+    g_rescan_running = True
+    ddc_log.info("🔄 Обновление мониторов...")
+    if reread_capabilities:
+        capabilities_cache.invalidate()
+    
+    # Подключенные мониторы опрашивают их рабочие потоки - при сканировании их шины не трогаем
+    known = {(entry["identity"], getattr(entry["monitor"].vcp, "bus_number", None)) for entry in g_monitors.values()}
+    
+    def scan():
+        global g_rescan_running
+        try:
+            # Номера шин I2C могли смениться после отключения - идентификаторы читаем заново
+            g_monitor_identities.clear()
+            # Мониторы без EDID перечитывают возможности: на шину могли подключить другую панель
+            capabilities_cache.forget_bus_identities()
+            scanned = probe_monitors(scan_monitors(), skip=known)
+        finally:
+            g_rescan_running = False
+        if ui_updater_global:
+            ui_updater_global.monitors_scanned.emit(scanned)
+        else:
+            apply_monitor_scan(scanned)
+    
+    thread = threading.Thread(target=scan, name="monitor-scan")
+    thread.daemon = True
+    thread.start()
 
-def refresh_monitors(tray_icon):
-    """Обновляет список мониторов"""
-    print("🔄 Обновление мониторов...")
-    # TODO: Реализовать обновление списка мониторов
-    print("✅ Мониторы обновлены")
+def apply_monitor_scan(scanned):
+    """Сравнивает найденные мониторы с известными по идентификатору и обновляет только изменившиеся"""
+    global monitors_global, g_rescan_pending
+    
+    found = {}
+    for identity, monitor, values in scanned:
+        found.setdefault(identity, (monitor, values))
+    known = {entry["identity"]: monitor_key for monitor_key, entry in g_monitors.items()}
+    
+    removed = 0
+    for identity, monitor_key in known.items():
+        monitor, _ = found.get(identity, (None, None))
+        old_bus = getattr(g_monitors[monitor_key]["monitor"].vcp, "bus_number", None)
+        new_bus = getattr(monitor.vcp, "bus_number", None) if monitor else None
+        # Тот же монитор на другой шине - подключаем заново с новым устройством
+        if monitor is None or old_bus != new_bus:
+            unregister_monitor(monitor_key)
+            removed += 1
+    
+    # Оставшиеся мониторы перечитываем с шины: после переподключения значения могли измениться
+    for monitor_key, entry in g_monitors.items():
+        if ddc_engine_global:
+            ddc_engine_global.request_state(monitor_key, entry["index"], max_age_ms=0)
+    
+    current = {entry["identity"] for entry in g_monitors.values()}
+    added = 0
+    for identity, (monitor, values) in found.items():
+        if identity not in current:
+            add_monitor_section(register_monitor(monitor, identity, values))
+            added += 1
+    
+    monitors_global = [entry["monitor"] for entry in sorted(g_monitors.values(), key=lambda entry: entry["index"])]
+    if g_menu_layout:
+        g_menu_layout["scanned"] = True
+    update_menu_layout()
+    ddc_log.info("✅ Мониторы обновлены: %s (добавлено %s, убрано %s)", len(monitors_global), added, removed)
+    
+    # Пока шло сканирование, могли подключить еще монитор (например, док-станция во время запуска)
+    if g_rescan_pending is not None and not g_rescan_running:
+        reread_capabilities, g_rescan_pending = g_rescan_pending, None
+        refresh_monitors(reread_capabilities=reread_capabilities)
 
-def update_brightness_display():
-    """Обновляет отображение текущей яркости в меню (только текст)"""
-    global monitors_global, g_menu_items, animators
+def register_monitors(scanned):
+    """Подключает к движку мониторы, найденные и опрошенные при запуске (probe_monitors)"""
+    global monitors_global
+    for identity, monitor, values in scanned:
+        register_monitor(monitor, identity, values)
+    monitors_global = [monitor for _, monitor, _ in scanned]
+
+def get_last_session():
+    """Значения мониторов с прошлого запуска: идентификатор -> поля MonitorState"""
+    return settings_store.get(LAST_SESSION_KEY, {})
+
+def save_last_session():
+    """Запоминает подключенные мониторы и их значения (в памяти, на диск - пакетом SettingsStore)"""
+    session = {}
+    for monitor_key, entry in sorted(g_monitors.items(), key=lambda item: item[1]["index"]):
+        state = g_monitor_states.get(monitor_key)
+        if state is not None and not is_bus_identity(entry["identity"]):
+            session[entry["identity"]] = {field: getattr(state, field) for field in MonitorState.FIELDS}
+    if session != get_last_session():
+        settings_store.put(LAST_SESSION_KEY, session)
+
+def register_monitor(monitor, identity, values=None):
+    """Подключает монитор к движку: номер, состояние, поток DDC, аниматор и опрос (без меню).
+    
+    values - результат чтения при сканировании; без него состояние читается в рабочем потоке.
+    """
+    # Номер монитора - наименьший свободный
+    used = {entry["index"] for entry in g_monitors.values()}
+    i = next(n for n in itertools.count() if n not in used)
+    monitor_key = f"monitor_{i}"
+    g_monitors[monitor_key] = {"monitor": monitor, "index": i, "identity": identity}
+    
+    # Имя модели берем из кэша возможностей, если монитор уже известен
+    cached_capabilities = capabilities_cache.get(identity)
+    model_name = cached_capabilities["model"] if cached_capabilities else None
+    state = g_monitor_states[monitor_key] = MonitorState(model_name)
+    
+    if values:
+        # Монитор уже прочитан при сканировании
+        state.update(values)
+        model_name = state.model
+    
+    # До первого чтения показываем значения с прошлого запуска (updated_at = 0 - состояние устарело)
+    last_values = None if is_bus_identity(identity) else get_last_session().get(identity)
+    if last_values and not values:
+        for field in MonitorState.FIELDS:
+            if last_values.get(field) is not None and getattr(state, field) in (None, []):
+                setattr(state, field, last_values[field])
+    
+    # Рабочий поток DDC для этого монитора
+    if ddc_engine_global:
+        ddc_engine_global.add_monitor(monitor_key, monitor, identity)
+    
+    # Создаем аниматор для этого монитора (имя уточнится после чтения модели)
+    animators[monitor_key] = {}
+    get_animator(monitor_key, VCP_BRIGHTNESS)
+    
+    # Читаем актуальное состояние в фоне (если его не прочитали при сканировании) и дальше опрашиваем адаптивно
+    if ddc_engine_global and not values:
+        ddc_engine_global.request_state(monitor_key, i)
+    if poll_scheduler_global:
+        poll_scheduler_global.add_monitor(monitor_key)
+    if values:
+        save_last_session()
+    
+    ddc_log.info("➕ Монитор %s подключен (%s)", i + 1, identity)
+    return monitor_key
+
+def unregister_monitor(monitor_key):
+    """Отключает монитор от движка и убирает его раздел меню"""
+    global animators, g_monitors
     
-    # Не обновляем меню, если идет анимация, чтобы избежать гонки состояний
-    if any(anim.is_animating for anim in animators):
-        print("🔄 Пропускаем обновление меню, идет анимация.")
-        return
-        
-    if not tray_icon_global or not monitors_global:
+    entry = g_monitors.pop(monitor_key, None)
+    if entry is None:
         return
-        
-    print("🔄 Обновляем отображение яркости в меню...")
     
-    # Получаем среднюю яркость всех мониторов для иконки
-    total_brightness = 0
-    monitor_count = 0
-    
-    for monitor in monitors_global:
+    remove_monitor_section(monitor_key)
+    for animator in animators.pop(monitor_key, {}).values():
+        animation_scheduler.cancel(animator)
+        animator.is_animating = False
+    if poll_scheduler_global:
+        poll_scheduler_global.remove_monitor(monitor_key)
+    if ddc_engine_global:
+        ddc_engine_global.remove_monitor(monitor_key)
+    g_monitor_states.pop(monitor_key, None)
+    # Ожидающие чтения запросы API получат ответ без этого монитора
+    for callback in g_state_waiters.pop(monitor_key, []):
+        callback(monitor_key)
+    save_last_session()
+    
+    ddc_log.info("➖ Монитор %s отключен (%s)", entry["index"] + 1, entry["identity"])
+
+def read_monitor_state(monitor, monitor_index, max_age_ms=SHADOW_MAX_AGE_MS):
+    """Читает возможности, текущий вход и значения кодов VCP монитора (выполняется в потоке DDC).
+    
+    monitor - MonitorSession: значения не старше max_age_ms берутся из теневого состояния без шины.
+    """
+    # Непрочитанные поля в результат не попадают: известные значения не затираются на "?"
+    values = {}
+    current_input, available_inputs, model_name = get_monitor_capabilities(monitor, monitor_index, max_age_ms)
+    values["inputs"] = available_inputs
+    if current_input is not None:
+        values["input"] = current_input
+    if model_name is not None:
+        values["model"] = model_name
+    
+    # Яркость читаем всегда, остальные коды - только заявленные в строке возможностей (например, 0x62 - есть динамики)
+    capabilities = capabilities_cache.get(get_monitor_identity(monitor, monitor_index))
+    declared = (capabilities or {}).get("vcp") or {}
+    for feature in VCP_FEATURES:
+        if feature.code == VCP_INPUT_SOURCE:
+            continue  # Прочитан вместе с возможностями
+        if feature.code != VCP_BRIGHTNESS and feature.code not in declared:
+            continue
         try:
             with monitor:
-                brightness = monitor.get_luminance()
-                if brightness is not None:
-                    total_brightness += brightness
-                    monitor_count += 1
-        except Exception:
-            pass
+                values[feature.key], _ = monitor.vcp.get_vcp_feature(feature.code, max_age_ms=max_age_ms)
+        except Exception as e:
+            ddc_log.warning("⚠️  Ошибка чтения %s (0x%02X) монитора %s: %s", feature.title.lower(), feature.code, monitor_index + 1, e)
     
-    # Обновляем иконку со средней яркостью
-    if monitor_count > 0:
-        avg_brightness = total_brightness // monitor_count
-        update_tray_icon_brightness(avg_brightness)
+    return values
+
+def get_transport_name(monitor):
+    """Транспорт DDC/CI монитора: monitorcontrol (LinuxVCP), i2c-dev или sim"""
+    return getattr(monitor.vcp, "transport", "monitorcontrol")
+
+def select_transport(monitor, profile):
+    """Сессия монитора на транспорте, выбранном при сканировании (выполняется в потоке опроса шины).
+    
+    "auto" - прямой /dev/i2c-N (monitor_i2c), если монитор отвечает через него на чтение
+    яркости, иначе monitorcontrol; "i2c-dev" и "monitorcontrol" - без проверки.
+    Имитированные мониторы остаются на своем транспорте.
+    """
+    if ddc_transport_global == "monitorcontrol" or get_transport_name(monitor) != "monitorcontrol":
+        profile.transport = get_transport_name(monitor)
+        return MonitorSession(monitor, profile=profile)
+    
+    import monitorcontrol
+    import monitor_i2c
+    direct = monitorcontrol.Monitor(monitor_i2c.I2CDevVCP(monitor.vcp.bus_number))
+    session = MonitorSession(direct, profile=profile)
+    if ddc_transport_global == "auto":
+        # Проверка - одна попытка без транзакции сессии, чтобы отказ не ухудшил надежность монитора
+        try:
+            with direct:
+                brightness, maximum = direct.vcp.get_vcp_feature(VCP_BRIGHTNESS)
+        except Exception as e:
+            ddc_log.info("ℹ️  Шина %s: прямой транспорт не отвечает (%s), используем monitorcontrol", monitor.vcp.bus_number, e)
+            profile.transport = get_transport_name(monitor)
+            return MonitorSession(monitor, profile=profile)
+        # Прочитанная яркость попадает в теневое состояние - при опросе она не перечитывается
+        session.shadow.record(VCP_BRIGHTNESS, brightness)
+        session.maximums[VCP_BRIGHTNESS] = maximum
+    ddc_log.debug("🔌 Шина %s: прямой транспорт i2c-dev", monitor.vcp.bus_number)
+    profile.transport = get_transport_name(direct)
+    return session
+
+def probe_monitors(monitors, skip=()):
+    """Определяет идентификаторы и читает состояние найденных мониторов - по задаче на шину I2C.
+    
+    Задержка DDC/CI почти целиком - фиксированные паузы между транзакциями, поэтому шины
+    опрашиваются одновременно. Монитор, не ответивший за PROBE_TIMEOUT_MS, пропускается
+    (подключится при следующем сканировании), остальные не ждут его. Опросы идут в
+    фоновых (daemon) потоках: зависший драйвер не задерживает выход из приложения,
+    а шина, опрос которой еще не завершился, при следующем сканировании не трогается.
+    Для пар (идентификатор, шина) из skip состояние не читается - значения None.
+    Возвращает список (идентификатор, монитор, значения) в порядке шин.
+    """
+    if not monitors:
+        return []
+    
+    def probe(i, monitor):
+        identity = get_monitor_identity(monitor, i)
+        bus_number = getattr(monitor.vcp, "bus_number", None)
+        if (identity, bus_number) in skip:
+            return identity, monitor, None
+        # Одно открытие устройства на все чтения, задержки попадают в статистику монитора
+        session = select_transport(monitor, ddc_profiler.monitor(identity, bus_number))
+        try:
+            return identity, session.monitor, read_monitor_state(session, i)
+        finally:
+            session.close()
     
-    # Обновляем текст существующих элементов меню
-    for i, monitor in enumerate(monitors_global):
-        monitor_key = f"monitor_{i}"
-        if monitor_key not in g_menu_items:
+    def run(future, i, monitor, bus_number):
+        try:
+            future.set_result(probe(i, monitor))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            g_probing_buses.discard(bus_number)
+    
+    futures = []
+    for i, monitor in enumerate(monitors):
+        bus_number = getattr(monitor.vcp, "bus_number", None)
+        if bus_number is not None and bus_number in g_probing_buses:
+            ddc_log.warning("⏳ Шина %s: прошлый опрос еще не завершен, пропускаем", bus_number)
+            futures.append(None)
+            continue
+        if bus_number is not None:
+            g_probing_buses.add(bus_number)
+        future = concurrent.futures.Future()
+        futures.append(future)
+        thread = threading.Thread(target=run, args=(future, i, monitor, bus_number), name=f"monitor-probe-{i}")
+        thread.daemon = True
+        thread.start()
+    # Зависшие задачи не ждем: шину занятого монитора освободит его задача, когда ответит драйвер
+    concurrent.futures.wait([future for future in futures if future], timeout=PROBE_TIMEOUT_MS / 1000)
+    
+    probed = []
+    for i, (monitor, future) in enumerate(zip(monitors, futures)):
+        if future is None:
+            continue
+        if not future.done():
+            ddc_log.warning("⏱️  Монитор на шине %s не ответил за %s мс, пропускаем",
+                            getattr(monitor.vcp, "bus_number", i), PROBE_TIMEOUT_MS)
             continue
-
         try:
-            # Получаем актуальные данные
-            with monitor:
-                current_brightness = monitor.get_luminance()
-                if current_brightness is None:
-                    current_brightness = "?"
-            
-            current_input, _, model_name = get_monitor_capabilities(monitor, i)
-            monitor_name = model_name if model_name else f"Монитор {i + 1}"
-            
-            # Обновляем заголовок
-            header_action = g_menu_items[monitor_key].get("header")
-            if header_action:
-                header_action.setText(f"📺 {monitor_name} (🔆 {current_brightness}%)")
-            
-            # Обновляем информацию о входе
-            input_info_action = g_menu_items[monitor_key].get("input_info")
+            identity, monitor, values = future.result()
+        except Exception as e:
+            ddc_log.warning("⚠️  Ошибка опроса монитора %s: %s", i + 1, e)
+            continue
+        probed.append((identity, monitor, values))
+    return probed
+
+def poll_monitor(monitor_key):
+    """Запрашивает фоновое чтение одного монитора; False, если сейчас его опрашивать нельзя.
+    
+    Опрос ищет изменения, сделанные кнопками монитора, поэтому значения всегда читаются
+    с шины (max_age_ms=0): ответ из теневого состояния планировщик принял бы за "без изменений".
+    """
+    entry = g_monitors.get(monitor_key)
+    if entry is None or not ddc_engine_global:
+        return False
+    
+    i = entry["index"]
+    # Значением монитора во время анимации владеет аниматор - шину не трогаем
+    if is_monitor_animating(monitor_key):
+        ui_log.debug("🔄 Пропускаем чтение монитора %s, идет анимация.", i + 1)
+        return False
+    
+    ui_log.debug("🔄 Запрашиваем состояние монитора %s...", i + 1)
+    return ddc_engine_global.request_state(monitor_key, i, max_age_ms=0)
+
+def update_brightness_display():
+    """Запрашивает фоновое чтение устаревших состояний, меню обновится по сигналу monitor_polled"""
+    global monitors_global, g_monitors, animators
+    
+    if not monitors_global or not ddc_engine_global:
+        return
+    
+    for monitor_key in list(g_monitors):
+        # Недавно прочитанное или записанное нами состояние не перечитываем
+        state = g_monitor_states.get(monitor_key)
+        if state and not state.is_stale(MONITOR_STATE_MAX_AGE_MS):
+            continue
+        poll_monitor(monitor_key)
+
+def on_monitor_polled(monitor_key, values):
+    """Результат опроса: применяем к меню и сообщаем планировщику опроса, изменилось ли что-то"""
+    state = g_monitor_states.get(monitor_key)
+    first_read = state is not None and state.updated_at == 0.0
+    changed = apply_monitor_state(monitor_key, values)
+    if poll_scheduler_global:
+        # Первое чтение и список входов/модель из кэша возможностей не говорят о действиях пользователя
+        user_changed = not first_read and bool(changed & USER_CHANGE_KEYS)
+        poll_scheduler_global.on_result(monitor_key, user_changed)
+    for callback in g_state_waiters.pop(monitor_key, []):
+        callback(monitor_key)
+
+def apply_monitor_state(monitor_key, values):
+    """Применяет новые значения к состоянию монитора, меню и иконке (выполняется в потоке GUI).
+    
+    values может содержать только часть полей (например, после нашей записи);
+    пункты меню перерисовываются только для изменившихся полей.
+    """
+    global g_monitors, g_monitor_states
+    
+    entry = g_monitors.get(monitor_key)
+    state = g_monitor_states.get(monitor_key)
+    if entry is None or state is None:
+        return set()
+    
+    changed = state.update(values)
+    if not changed:
+        return changed
+    
+    # Имя аниматора используется как ключ сохраненных настроек
+    if "model" in changed and state.model:
+        for animator in animators.get(monitor_key, {}).values():
+            animator.rename(state.model)
+    
+    # Запоминаем значения для показа при следующем запуске
+    save_last_session()
+    
+    if "brightness" in changed:
+        # Обновляем иконку со средней яркостью
+        known = [s.brightness for s in g_monitor_states.values() if s.brightness is not None]
+        if known:
+            update_tray_icon_brightness(sum(known) // len(known))
+    
+    refresh_monitor_section(monitor_key, changed)
+    return changed
+
+def refresh_monitor_section(monitor_key, changed):
+    """Перерисовывает пункты раздела монитора для изменившихся полей состояния"""
+    items = g_menu_items.get(monitor_key)
+    state = g_monitor_states.get(monitor_key)
+    if items is None or state is None:
+        return
+    
+    i = items["index"]
+    monitor_name = state.model if state.model else f"Монитор {i + 1}"
+    
+    try:
+        # Обновляем заголовок
+        header_action = items.get("header")
+        if header_action and changed & {"brightness", "model"}:
+            brightness_text = state.brightness if state.brightness is not None else "?"
+            header_action.setText(f"📺 {monitor_name} (🔆 {brightness_text}%)")
+        
+        # Набор функций и список входов известны только после чтения возможностей
+        if changed & {"inputs", "model"}:
+            sync_feature_actions(monitor_key)
+        
+        # Обновляем информацию о входе
+        if "input" in changed:
+            input_info_action = items.get("input_info")
             if input_info_action:
-                if current_input is not None:
-                    input_info_action.setText(f"   🔌 Текущий: {get_input_name(current_input)}")
+                if state.input is not None:
+                    input_info_action.setText(f"   🔌 Текущий: {get_input_name(state.input)}")
                     input_info_action.setVisible(True)
                 else:
                     input_info_action.setVisible(False)
-            
-            # Обновляем маркеры текущего входа
-            input_actions = g_menu_items[monitor_key].get("inputs", {})
-            for code, action in input_actions.items():
-                input_name = get_input_name(code)
-                current_marker = " ◀" if code == current_input else ""
-                action.setText(f"     ▸ {input_name}{current_marker}")
+        
+        # Отмечаем пресеты и значения, совпадающие с текущими
+        for code, block in items.get("features", {}).items():
+            feature = VCP_FEATURES_BY_CODE[code]
+            if feature.key not in changed and "inputs" not in changed:
+                continue
+            current = getattr(state, feature.key)
+            for value, (action, text) in block["actions"].items():
+                current_marker = " ◀" if value == current else ""
+                action.setText(f"{text}{current_marker}")
+    
+    except Exception as e:
+        ui_log.error("❌ Ошибка обновления меню для монитора %s: %s", i + 1, e)
+        header_action = items.get("header")
+        if header_action:
+            header_action.setText(f"❌ Монитор {i + 1}: Ошибка")
 
-        except Exception as e:
-            print(f"❌ Ошибка обновления меню для монитора {i + 1}: {e}")
-            header_action = g_menu_items[monitor_key].get("header")
-            if header_action:
-                header_action.setText(f"❌ Монитор {i + 1}: Ошибка")
+def feature_actions(items):
+    """Все пункты управления кодами VCP раздела монитора"""
+    actions = []
+    for block in items.get("features", {}).values():
+        if block["label"]:
+            actions.append(block["label"])
+        actions.extend(action for action, _ in block["actions"].values())
+    return actions
+
+def sync_feature_actions(monitor_key):
+    """Перестраивает пункты управления кодами VCP по строке возможностей, если набор изменился.
+    
+    Непрерывные коды получают пресеты, перечисления - заголовок и список значений.
+    """
+    items = g_menu_items[monitor_key]
+    state = g_monitor_states[monitor_key]
+    capabilities = capabilities_cache.get(g_monitors[monitor_key]["identity"])
+    
+    layout = []
+    for feature in get_supported_features(capabilities):
+        if feature.is_choice:
+            choices = get_feature_choices(feature, capabilities, state)
+            if choices:
+                layout.append((feature.code, tuple(choices)))
+        else:
+            layout.append((feature.code, tuple(value for _, value in feature.presets)))
+    if layout == items.get("feature_layout"):
+        return
+    
+    menu = items["menu"]
+    monitor = items["monitor"]
+    i = items["index"]
+    for action in feature_actions(items):
+        menu.removeAction(action)
+        action.deleteLater()
+    items["features"] = {}
+    items["feature_layout"] = layout
+    
+    # Пункты вставляются перед разделителем, которым заканчивается раздел
+    def add_action(text, enabled=True):
+        action = QAction(text, menu)
+        action.setEnabled(enabled)
+        menu.insertAction(items["separator"], action)
+        return action
+    
+    for code, values in layout:
+        feature = VCP_FEATURES_BY_CODE[code]
+        block = {"label": None, "actions": {}}
+        if feature.is_choice:
+            block["label"] = add_action(f"   {feature.emoji} {feature.title}:", enabled=False)
+            for value in values:
+                text = f"     ▸ {feature.value_name(value)}"
+                action = add_action(text)
+                action.triggered.connect(lambda checked, mon=monitor, c=code, val=value, idx=i: set_monitor_feature(mon, c, val, idx))
+                block["actions"][value] = (action, text)
+        else:
+            for emoji, value in feature.presets:
+                text = feature.preset_format.format(emoji=emoji, value=value)
+                action = add_action(text)
+                action.triggered.connect(lambda checked, mon=monitor, c=code, val=value, idx=i: set_monitor_feature(mon, c, val, idx))
+                block["actions"][value] = (action, text)
+        items["features"][code] = block
+    
+    # Отмечаем текущие значения в новых пунктах
+    refresh_monitor_section(monitor_key, {feature.key for feature in VCP_FEATURES})
 
-def get_monitor_capabilities(monitor, monitor_index):
-    """Получает возможности монитора, включая доступные входы и модель"""
+def get_monitor_capabilities(monitor, monitor_index, max_age_ms=SHADOW_MAX_AGE_MS):
+    """Получает возможности монитора, включая доступные входы и модель.
+    
+    Строка возможностей читается с шины только при отсутствии в кэше.
+    """
+    identity = get_monitor_identity(monitor, monitor_index)
+    capabilities = capabilities_cache.get(identity)
+    
     try:
         with monitor:
             # Получаем текущий источник входа
             try:
-                current_input = monitor.get_input_source()
-                print(f"📍 Монитор {monitor_index + 1} - текущий вход: {current_input}")
+                current_input = monitor.get_input_source(max_age_ms=max_age_ms)
+                ddc_log.debug("📍 Монитор %s - текущий вход: %s", monitor_index + 1, current_input)
             except Exception:
                 current_input = None
                 
             # Получаем возможности монитора включая модель
-            try:
-                capabilities = monitor.get_vcp_capabilities()
-                available_inputs = []
-                model_name = None
-                
-                if capabilities:
-                    # Получаем доступные входы
-                    if 'inputs' in capabilities:
-                        available_inputs = capabilities['inputs']
-                        print(f"📋 Монитор {monitor_index + 1} - доступные входы: {available_inputs}")
-                    
-                    # Получаем название модели
-                    if 'model' in capabilities:
-                        model_name = capabilities['model']
-                        print(f"📺 Монитор {monitor_index + 1} - модель: {model_name}")
-                
-                if not available_inputs:
-                    # Стандартные входы если не удалось получить
-                    available_inputs = [15, 17, 18]  # DP1, HDMI1, HDMI2
-                    print(f"📋 Монитор {monitor_index + 1} - используем стандартные входы")
-            except Exception:
-                available_inputs = [15, 17, 18]  # DP1, HDMI1, HDMI2
-                model_name = None
-                print(f"📋 Монитор {monitor_index + 1} - ошибка получения входов, используем стандартные")
-                
-        return current_input, available_inputs, model_name
+            if capabilities is None:
+                try:
+                    capabilities = normalize_capabilities(monitor.get_vcp_capabilities())
+                    capabilities_cache.put(identity, capabilities)
+                    ddc_log.info("💾 Монитор %s - возможности сохранены в кэш (%s)", monitor_index + 1, identity)
+                except Exception:
+                    ddc_log.warning("📋 Монитор %s - ошибка получения входов, используем стандартные", monitor_index + 1)
+                    return current_input, [15, 17, 18], None  # DP1, HDMI1, HDMI2
     except Exception as e:
-        print(f"❌ Ошибка получения возможностей монитора {monitor_index + 1}: {e}")
+        ddc_log.error("❌ Ошибка получения возможностей монитора %s: %s", monitor_index + 1, e)
         return None, [15, 17, 18], None
+    
+    available_inputs = capabilities["inputs"]
+    model_name = capabilities["model"]
+    
+    if not available_inputs:
+        # Стандартные входы если не удалось получить
+        available_inputs = [15, 17, 18]  # DP1, HDMI1, HDMI2
+        
+    return current_input, available_inputs, model_name
 
 def get_input_name(input_code):
     """Возвращает название входа по коду"""
-    input_names = {
-        15: "DP-1",
-        17: "HDMI-1", 
-        18: "HDMI-2",
-        25: "Type-C"  # Некоторые мониторы используют этот код для USB-C
+    return monitor_ipc.get_input_name(input_code)
+
+def create_monitor_menus(menu):
+    """Создает плоскую структуру меню для подключенных мониторов и сохраняет ссылки на элементы.
+    
+    Меню строится без обращения к шине: актуальные значения читаются в потоках
+    DDCEngine и подставляются в пункты меню по сигналу monitor_state.
+    Разделы мониторов добавляются и удаляются по одному (add_monitor_section /
+    remove_monitor_section), поэтому при горячем подключении меню не пересоздается.
+    """
+    global g_menu_layout
+    
+    # Пока идет первое сканирование, показываем мониторы прошлого запуска с сохраненной яркостью
+    scanning_action = menu.addAction("🔍 Поиск мониторов…")
+    scanning_action.setEnabled(False)
+    placeholders = [scanning_action]
+    for identity, values in get_last_session().items():
+        name = values.get("model") or identity
+        brightness = values.get("brightness")
+        action = menu.addAction(f"📺 {name} (🔆 {brightness if brightness is not None else '…'}%)")
+        action.setEnabled(False)
+        placeholders.append(action)
+    
+    # Общие пункты создаются один раз, разделы мониторов вставляются перед ними
+    no_monitors_action = menu.addAction("❌ Мониторы не найдены")
+    no_monitors_action.setEnabled(False)
+    help_action = menu.addAction("💡 Включите DDC/CI в настройках монитора")
+    help_action.setEnabled(False)
+    
+    # Сцены: именованные наборы значений для всех мониторов (пункты добавляет sync_scene_actions)
+    scenes_separator = menu.addSeparator()
+    scenes_header = menu.addAction("🎬 Сцены")
+    scenes_header.setEnabled(False)
+    
+    # Синхронная яркость всех мониторов (одна анимация на общих часах)
+    all_separator = menu.addSeparator()
+    all_header = menu.addAction("🖥️ Все мониторы")
+    all_header.setEnabled(False)
+    all_actions = [all_separator, all_header]
+    brightness_feature = VCP_FEATURES_BY_CODE[VCP_BRIGHTNESS]
+    for emoji, brightness in brightness_feature.presets:
+        action = menu.addAction(brightness_feature.preset_format.format(emoji=emoji, value=brightness))
+        action.triggered.connect(lambda checked, val=brightness: set_all_monitors_brightness(val))
+        all_actions.append(action)
+    
+    g_menu_layout = {
+        "menu": menu,
+        "anchor": no_monitors_action,
+        "no_monitors": [no_monitors_action, help_action],
+        "all_monitors": all_actions,
+        "scenes": [scenes_separator, scenes_header],
+        "scene_actions": [],
+        "placeholders": placeholders,
+        "scanned": bool(g_monitors),
     }
-    return input_names.get(input_code, f"Вход {input_code}")
+    
+    for monitor_key in sorted(g_monitors, key=lambda key: g_monitors[key]["index"]):
+        add_monitor_section(monitor_key)
+    sync_scene_actions()
 
-def create_monitor_menus(menu, monitors):
-    """Создает плоскую структуру меню для мониторов и сохраняет ссылки на элементы"""
-    global animators, ui_updater_global, g_menu_items
+def add_monitor_section(monitor_key):
+    """Добавляет в меню раздел подключенного монитора"""
+    global g_menu_items
     
-    if monitors:
-        for i, monitor in enumerate(monitors):
-            monitor_key = f"monitor_{i}"
-            g_menu_items[monitor_key] = {}
-            
-            try:
-                # Получаем текущую яркость
-                try:
-                    with monitor:
-                        current_brightness = monitor.get_luminance()
-                        if current_brightness is None:
-                            current_brightness = 50
-                except Exception:
-                    current_brightness = 50
-                
-                # Получаем возможности монитора
-                current_input, available_inputs, model_name = get_monitor_capabilities(monitor, i)
-                
-                # Формируем название монитора
-                monitor_name = model_name if model_name else f"Монитор {i + 1}"
-                
-                # Заголовок монитора с текущей яркостью
-                monitor_header = menu.addAction(f"📺 {monitor_name} (🔆 {current_brightness}%)")
-                monitor_header.setEnabled(False)
-                g_menu_items[monitor_key]["header"] = monitor_header
-                
-                # Показать текущий вход если известен
-                input_info = menu.addAction(f"   🔌 Текущий: {get_input_name(current_input)}")
-                input_info.setEnabled(False)
-                g_menu_items[monitor_key]["input_info"] = input_info
-                if current_input is None:
-                    input_info.setVisible(False)
-                
-                # Inline кнопки яркости с эмодзи
-                brightness_emojis = ["🌑", "🌘", "🌗", "🌖", "🌕"]
-                brightness_values = [0, 25, 50, 75, 100]
-                for j, (emoji, brightness) in enumerate(zip(brightness_emojis, brightness_values)):
-                    action = menu.addAction(f"   {emoji} {brightness}%")
-                    action.triggered.connect(lambda checked, mon=monitor, val=brightness, idx=i: set_monitor_brightness(mon, val, idx))
-                
-                # Inline кнопки громкости
-                volume_emojis = ["🔇", "🔈", "🔉", "🔊"]
-                volume_values = [0, 25, 50, 100]
-                for j, (emoji, volume) in enumerate(zip(volume_emojis, volume_values)):
-                    action = menu.addAction(f"   {emoji} Громкость {volume}%")
-                    action.triggered.connect(lambda checked, mon=monitor, val=volume, idx=i: set_monitor_volume(mon, val, idx))
-                
-                # Доступные источники входа
-                if available_inputs:
-                    menu.addAction("   🔌 Источники входа:").setEnabled(False)
-                    g_menu_items[monitor_key]["inputs"] = {}
-                    for input_code in available_inputs:
-                        input_name = get_input_name(input_code)
-                        current_marker = " ◀" if input_code == current_input else ""
-                        action = menu.addAction(f"     ▸ {input_name}{current_marker}")
-                        action.triggered.connect(lambda checked, mon=monitor, code=input_code, idx=i: set_monitor_input(mon, code, idx))
-                        g_menu_items[monitor_key]["inputs"][input_code] = action
-                
-                # Разделитель между мониторами
-                if i < len(monitors) - 1:
-                    menu.addSeparator()
-                    
-                # Создаем аниматор для этого монитора
-                if i >= len(animators):
-                    # Используем более точное имя для сохранения настроек
-                    animator_name = model_name if model_name else f"Монитор {i + 1}"
-                    animator = BrightnessAnimator(
-                        monitor, 
-                        animator_name,
-                        ui_updater_global
-                    )
-                    animators.append(animator)
-                    
-            except Exception as e:
-                print(f"Ошибка создания меню для монитора {i + 1}: {e}")
-                error_action = menu.addAction(f"❌ Монитор {i + 1}: Ошибка")
-                error_action.setEnabled(False)
-    else:
-        no_monitors_action = menu.addAction("❌ Мониторы не найдены")
-        no_monitors_action.setEnabled(False)
+    if not g_menu_layout:
+        return  # Без трея (режим службы) меню нет
+    
+    menu = g_menu_layout["menu"]
+    entry = g_monitors[monitor_key]
+    monitor = entry["monitor"]
+    i = entry["index"]
+    
+    # Раздел встает в меню по порядку номеров мониторов
+    following = [items for items in g_menu_items.values() if items["index"] > i]
+    before = min(following, key=lambda items: items["index"])["actions"][0] if following else g_menu_layout["anchor"]
+    
+    section = []
+    def add_action(text):
+        action = QAction(text, menu)
+        menu.insertAction(before, action)
+        section.append(action)
+        return action
+    
+    g_menu_items[monitor_key] = {"menu": menu, "monitor": monitor, "index": i, "actions": section}
+    
+    try:
+        model_name = g_monitor_states[monitor_key].model
+        monitor_name = model_name if model_name else f"Монитор {i + 1}"
+        
+        # Заголовок монитора, яркость подставится после фонового чтения
+        monitor_header = add_action(f"📺 {monitor_name} (🔆 …%)")
+        monitor_header.setEnabled(False)
+        g_menu_items[monitor_key]["header"] = monitor_header
+        
+        # Текущий вход показывается, когда станет известен
+        input_info = add_action("   🔌 Текущий: …")
+        input_info.setEnabled(False)
+        input_info.setVisible(False)
+        g_menu_items[monitor_key]["input_info"] = input_info
+        
+        # Пункты управления кодами VCP строятся по строке возможностей (sync_feature_actions)
+        g_menu_items[monitor_key]["features"] = {}
+        g_menu_items[monitor_key]["feature_layout"] = None
         
-        help_action = menu.addAction("💡 Включите DDC/CI в настройках монитора")
-        help_action.setEnabled(False)
+        # Разделитель после раздела (повторяющиеся разделители QMenu схлопывает)
+        separator = QAction(menu)
+        separator.setSeparator(True)
+        menu.insertAction(before, separator)
+        section.append(separator)
+        g_menu_items[monitor_key]["separator"] = separator
+        
+        sync_feature_actions(monitor_key)
+        
+        # Состояние могло быть прочитано (или взято с прошлого запуска) раньше, чем появилось меню
+        state = g_monitor_states[monitor_key]
+        if state.updated_at or state.brightness is not None:
+            refresh_monitor_section(monitor_key, set(MonitorState.FIELDS))
+            
+    except Exception as e:
+        ui_log.error("Ошибка создания меню для монитора %s: %s", i + 1, e)
+        error_action = add_action(f"❌ Монитор {i + 1}: Ошибка")
+        error_action.setEnabled(False)
 
-def set_monitor_brightness(monitor, brightness, monitor_index):
-    """Устанавливает яркость монитора с анимацией"""
-    global animators
+def remove_monitor_section(monitor_key):
+    """Убирает из меню раздел отключенного монитора"""
+    global g_menu_items
     
-    print(f"🎛️  Brightness change requested: {brightness}% for Monitor {monitor_index + 1}")
+    items = g_menu_items.pop(monitor_key, None)
+    if items is None:
+        return
     
-    # Используем аниматор если он существует
-    if monitor_index < len(animators) and animators[monitor_index]:
-        animators[monitor_index].set_target(brightness)
-    else:
-        # Если аниматора нет, устанавливаем напрямую
-        try:
-            print(f"🔧 Setting brightness directly to {brightness}% for Monitor {monitor_index + 1}...")
-            with monitor:
-                monitor.set_luminance(brightness)
-            print(f"✅ Brightness set to {brightness}% for Monitor {monitor_index + 1}")
-            
-            # Обновляем иконку в system tray
-            update_tray_icon_brightness(brightness)
-            
-        except Exception as e:
-            print(f"❌ Error setting brightness for Monitor {monitor_index + 1}: {e}")
+    menu = items["menu"]
+    for action in items["actions"] + feature_actions(items):
+        menu.removeAction(action)
+        action.deleteLater()
 
-def set_monitor_volume(monitor, volume, monitor_index):
-    """Устанавливает громкость монитора"""
-    try:
-        print(f"🔧 Setting volume to {volume}% for Monitor {monitor_index + 1}...")
-        with monitor:
-            monitor.vcp.set_vcp_feature(0x62, volume)
-        print(f"✅ Volume set to {volume}% for Monitor {monitor_index + 1}")
-    except Exception as e:
-        print(f"❌ Error setting volume for Monitor {monitor_index + 1}: {e}")
+def update_menu_layout():
+    """Показывает общие пункты меню в зависимости от числа мониторов и обновляет иконку"""
+    count = len(g_monitors)
+    scanned = g_menu_layout.get("scanned", True)
+    for action in g_menu_layout.get("placeholders", []):
+        action.setVisible(not scanned)
+    for action in g_menu_layout.get("no_monitors", []):
+        action.setVisible(scanned and count == 0)
+    for action in g_menu_layout.get("all_monitors", []):
+        action.setVisible(count > 1)
+    for action in g_menu_layout.get("scenes", []) + g_menu_layout.get("scene_actions", []):
+        action.setVisible(count > 0)
+    
+    known = [s.brightness for s in g_monitor_states.values() if s.brightness is not None]
+    if not scanned:
+        # До первого сканирования иконка показывает яркость прошлого запуска
+        known = [values["brightness"] for values in get_last_session().values() if values.get("brightness") is not None]
+    update_tray_icon_brightness(sum(known) // len(known) if known else None)
 
-def set_monitor_input(monitor, input_code, monitor_index):
-    """Устанавливает источник входа монитора"""
-    global ui_updater_global
-    try:
-        input_name = get_input_name(input_code)
-        print(f"🔧 Переключаем на {input_name} для Монитора {monitor_index + 1}...")
+def get_animator(monitor_key, code):
+    """Аниматор кода VCP монитора; создается при первом обращении (None для кодов без анимации)"""
+    feature = VCP_FEATURES_BY_CODE[code]
+    monitor_animators = animators.get(monitor_key)
+    if not feature.animated or monitor_animators is None:
+        return None
+    if code not in monitor_animators:
+        entry = g_monitors[monitor_key]
+        model_name = g_monitor_states[monitor_key].model
+        worker = ddc_engine_global.workers.get(monitor_key) if ddc_engine_global else None
+        monitor_animators[code] = FeatureAnimator(
+            entry["monitor"],
+            model_name if model_name else f"Монитор {entry['index'] + 1}",
+            ui_updater_global,
+            worker,
+            code
+        )
+    return monitor_animators[code]
+
+def is_monitor_animating(monitor_key):
+    """Идет ли у монитора анимация какого-либо кода"""
+    return any(animator.is_animating for animator in animators.get(monitor_key, {}).values())
+
+def set_monitor_feature(monitor, code, value, monitor_index):
+    """Устанавливает значение кода VCP монитора: плавно через аниматор или одной записью в потоке DDC.
+    
+    Записи одного кода объединяются (уходит последнее значение), попадают в теневое
+    состояние и статистику, а результат сразу отражается в меню без чтения с шины.
+    """
+    feature = VCP_FEATURES_BY_CODE[code]
+    monitor_key = f"monitor_{monitor_index}"
+    ui_log.debug("🎛️  %s: %s для Монитора %s", feature.title, value, monitor_index + 1)
+    notify_monitor_interaction(monitor_index)
+    
+    animator = get_animator(monitor_key, code)
+    if animator:
+        animator.set_target(value)
+        return
+    
+    display_value = feature.value_name(value) if feature.is_choice else f"{value}%"
+    def job(monitor):
         with monitor:
-            monitor.set_input_source(input_code)
-        print(f"✅ Источник переключен на {input_name} для Монитора {monitor_index + 1}")
-        # Обновляем меню после переключения с дебаунсингом
+            monitor.vcp.set_vcp_feature(code, value)
+        ddc_log.info("✅ %s: %s для Монитора %s", feature.title, display_value, monitor_index + 1)
+        # Записанное значение известно - перечитывать его с шины не нужно
         if ui_updater_global:
-            ui_updater_global.request_update()
+            ui_updater_global.monitor_state.emit(monitor_key, {feature.key: value})
+    
+    submit_monitor_job(monitor, monitor_index, job, f"❌ Ошибка установки {feature.title.lower()} для Монитора {monitor_index + 1}", key=feature.key)
+
+def set_all_monitors_brightness(brightness):
+    """Устанавливает яркость всех мониторов одной синхронной анимацией"""
+    global animators
+    
+    ui_log.debug("🎛️  Brightness change requested: %s%% for all monitors", brightness)
+    for entry in g_monitors.values():
+        notify_monitor_interaction(entry["index"])
+    group = [get_animator(monitor_key, VCP_BRIGHTNESS) for monitor_key in g_monitors if monitor_key in animators]
+    if group:
+        animation_scheduler.animate(group, brightness)
+
+def validate_scene(scene):
+    """Проверяет сцену из настроек: мониторы -> {параметр: значение}; ошибка - ValueError.
+    
+    Относительные значения ("+10") проверяются только по форме: их можно применить,
+    когда текущее значение монитора уже прочитано.
+    """
+    if not isinstance(scene, dict) or not scene:
+        raise ValueError("сцена должна быть непустым объектом {монитор: {параметр: значение}}")
+    for target, values in scene.items():
+        if not isinstance(values, dict):
+            raise ValueError(f"значения монитора {target} должны быть объектом")
+        for key, value in values.items():
+            feature = VCP_FEATURES_BY_KEY.get(key)
+            if feature is None:
+                raise ValueError(f"неизвестный параметр сцены: {key}")
+            try:
+                if feature.is_choice:
+                    feature.resolve_choice(value)
+                else:
+                    monitor_ipc.resolve_level(value, 0)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"некорректное значение {key} для монитора {target}: {value!r}") from e
+
+def get_scenes():
+    """Именованные сцены из настроек (при первом запуске - сцены по умолчанию).
+    
+    Сцены правятся вручную в файле настроек: сцена с ошибкой пропускается с предупреждением.
+    """
+    scenes = settings_store.get(SCENES_KEY)
+    if scenes is None:
+        scenes = DEFAULT_SCENES
+        settings_store.put(SCENES_KEY, scenes)
+    if not isinstance(scenes, dict):
+        ui_log.warning("⚠️  Сцены в настройках должны быть объектом {имя: сцена}, сцены не загружены")
+        return {}
+    valid = {}
+    errors = {}
+    for name, scene in scenes.items():
+        try:
+            validate_scene(scene)
+        except ValueError as e:
+            errors[name] = str(e)
+            # Предупреждаем один раз, а не при каждой перестройке меню
+            if g_scene_errors.get(name) != errors[name]:
+                ui_log.warning("⚠️  Сцена %s пропущена: %s", name, e)
+            continue
+        valid[name] = scene
+    g_scene_errors.clear()
+    g_scene_errors.update(errors)
+    return valid
+
+def compile_scene(scene):
+    """Составляет план применения сцены: {ключ монитора: [(VCPFeature, значение)]}.
+    
+    Значения для конкретного монитора важнее значений для "all"; мониторы сцены,
+    которые сейчас не подключены, пропускаются. Переключение входа идет последним:
+    после него монитор какое-то время не отвечает по DDC/CI. Значения проверяются
+    целиком до записи - с ошибкой в сцене не применяется ничего.
+    """
+    wanted = {}
+    for target in sorted(scene, key=lambda target: target != "all"):
+        try:
+            monitor_keys = resolve_monitor_keys(target)
+        except ValueError:
+            ui_log.debug("🎬 Монитор сцены %s не подключен", target)
+            continue
+        for monitor_key in monitor_keys:
+            wanted.setdefault(monitor_key, {}).update(scene[target])
+    
+    plan = {}
+    for monitor_key, values in wanted.items():
+        state = g_monitor_states[monitor_key]
+        writes = []
+        for key, value in values.items():
+            feature = VCP_FEATURES_BY_KEY.get(key)
+            if feature is None:
+                raise ValueError(f"неизвестный параметр сцены: {key}")
+            if feature.is_choice:
+                writes.append((feature, feature.resolve_choice(value)))
+            else:
+                writes.append((feature, monitor_ipc.resolve_level(value, getattr(state, key) if state.updated_at else None)))
+        writes.sort(key=lambda write: write[0].code == VCP_INPUT_SOURCE)
+        plan[monitor_key] = writes
+    return plan
+
+def apply_scene(name):
+    """Применяет сцену: по одной задаче на монитор, мониторы - параллельно, каждый в своем потоке DDC.
+    
+    Значение, которое по свежему (не старше SHADOW_MAX_AGE_MS) теневому состоянию уже
+    установлено на мониторе, не записывается (проверяется в потоке монитора, после уже
+    поставленных в очередь записей). Более старое значение могли изменить кнопками монитора.
+    Возвращает план {ключ монитора: {параметр: значение}}.
+    """
+    scenes = get_scenes()
+    if name not in scenes:
+        raise ValueError(f"сцена не найдена или содержит ошибку: {name}")
+    plan = compile_scene(scenes[name])
+    ui_log.info("🎬 Сцена %s: мониторов %s, значений %s", name, len(plan), sum(len(writes) for writes in plan.values()))
+    
+    for monitor_key, writes in plan.items():
+        entry = g_monitors[monitor_key]
+        i = entry["index"]
+        # Иначе следующие кадры идущей анимации перезапишут значения сцены
+        for feature, _ in writes:
+            animator = animators.get(monitor_key, {}).get(feature.code)
+            if animator and animator.is_animating:
+                animator.stop()
+        notify_monitor_interaction(i)
+        
+        def job(monitor, monitor_key=monitor_key, writes=writes, i=i):
+            written = {}
+            skipped = 0
+            shadow = getattr(monitor, "shadow", None)  # Без движка DDC (монитор вне меню) теневого состояния нет
+            try:
+                with monitor:
+                    for feature, value in writes:
+                        if shadow is not None and shadow.get(feature.code, SHADOW_MAX_AGE_MS) == value:
+                            skipped += 1
+                            continue
+                        try:
+                            monitor.vcp.set_vcp_feature(feature.code, value)
+                            written[feature.key] = value
+                        except Exception as e:
+                            ddc_log.error("❌ Сцена %s: ошибка установки %s для Монитора %s: %s", name, feature.title.lower(), i + 1, e)
+            finally:
+                # Записанные значения известны - перечитывать их с шины не нужно
+                if written and ui_updater_global:
+                    ui_updater_global.monitor_state.emit(monitor_key, written)
+            ddc_log.info("✅ Сцена %s для Монитора %s: записано %s, уже установлено %s", name, i + 1, len(written), skipped)
+        
+        submit_monitor_job(entry["monitor"], i, job, f"❌ Ошибка применения сцены {name} для Монитора {i + 1}", key="scene")
+    return {monitor_key: {feature.key: value for feature, value in writes} for monitor_key, writes in plan.items()}
+
+def save_scene(name):
+    """Сохраняет текущие значения всех мониторов как сцену (мониторы - по идентификатору EDID)"""
+    scene = {}
+    for monitor_key in resolve_monitor_keys("all"):
+        state = g_monitor_states[monitor_key]
+        if not state.updated_at:
+            continue  # Значения прошлого запуска могли устареть
+        values = {feature.key: getattr(state, feature.key) for feature in VCP_FEATURES if getattr(state, feature.key) is not None}
+        if values:
+            scene[g_monitors[monitor_key]["identity"]] = values
+    if not scene:
+        raise ValueError("значения мониторов еще не прочитаны")
+    validate_scene(scene)
+    # Сцены с ошибками остаются в файле как есть - их можно исправить вручную
+    get_scenes()
+    stored = settings_store.get(SCENES_KEY)
+    scenes = dict(stored) if isinstance(stored, dict) else {}
+    scenes[name] = scene
+    settings_store.put(SCENES_KEY, scenes)
+    sync_scene_actions()
+    ui_log.info("💾 Сцена %s сохранена: мониторов %s", name, len(scene))
+    return scene
+
+def sync_scene_actions():
+    """Перестраивает пункты сцен в меню по настройкам"""
+    menu = g_menu_layout.get("menu")
+    if menu is None:
+        return
+    for action in g_menu_layout["scene_actions"]:
+        menu.removeAction(action)
+        action.deleteLater()
+    
+    # Пункты сцен вставляются перед разделом "Все мониторы"
+    actions = []
+    for name in get_scenes():
+        action = QAction(f"   🎬 {name}", menu)
+        action.triggered.connect(lambda checked, scene=name: on_scene_triggered(scene))
+        menu.insertAction(g_menu_layout["all_monitors"][0], action)
+        actions.append(action)
+    g_menu_layout["scene_actions"] = actions
+    update_menu_layout()
+
+def on_scene_triggered(name):
+    """Пункт меню сцены: ошибка (например, относительное значение до первого чтения) пишется в журнал"""
+    try:
+        apply_scene(name)
     except Exception as e:
-        print(f"❌ Ошибка переключения источника для Монитора {monitor_index + 1}: {e}")
+        ui_log.error("❌ Не удалось применить сцену %s: %s", name, e)
+
+def notify_monitor_interaction(monitor_index):
+    """Сообщает планировщику опроса о действии пользователя: монитор какое-то время опрашивается чаще"""
+    if poll_scheduler_global:
+        poll_scheduler_global.notify_interaction(f"monitor_{monitor_index}")
+
+def submit_monitor_job(monitor, monitor_index, job, error_message, key=None):
+    """Выполняет запись в потоке DDC монитора, ошибки печатаются с переданным префиксом.
+    
+    Записи с одинаковым key объединяются: если предыдущая ещё не отправлена, уйдет только последняя.
+    """
+    def guarded(monitor):
+        try:
+            job(monitor)
+        except Exception as e:
+            ddc_log.error("%s: %s", error_message, e)
+    
+    if ddc_engine_global and ddc_engine_global.submit(f"monitor_{monitor_index}", guarded, key=key):
+        return
+    # Движок недоступен (например, монитор вне меню) - выполняем в отдельном потоке
+    thread = threading.Thread(target=guarded, args=(monitor,))
+    thread.daemon = True
+    thread.start()
+
+def resolve_monitor_keys(target):
+    """Ключи мониторов по номеру (с 1), идентификатору EDID или "all" из запроса API"""
+    ordered = sorted(g_monitors, key=lambda key: g_monitors[key]["index"])
+    if target is None or target == "all":
+        if not ordered:
+            raise ValueError("мониторы не найдены")
+        return ordered
+    for monitor_key in ordered:
+        entry = g_monitors[monitor_key]
+        if str(entry["index"] + 1) == str(target) or entry["identity"] == target:
+            return [monitor_key]
+    raise ValueError(f"монитор не найден: {target}")
+
+def describe_monitor(monitor_key):
+    """Состояние монитора для ответа API"""
+    entry = g_monitors[monitor_key]
+    state = g_monitor_states[monitor_key]
+    animator = get_animator(monitor_key, VCP_BRIGHTNESS)
+    description = {
+        "monitor": entry["index"] + 1,
+        "identity": entry["identity"],
+        "model": state.model,
+    }
+    for feature in VCP_FEATURES:
+        description[feature.key] = getattr(state, feature.key)
+    description.update({
+        "target_brightness": animator.target_value if animator and animator.is_animating else state.brightness,
+        "input_name": get_input_name(state.input) if state.input is not None else None,
+        "inputs": state.inputs,
+        "age_ms": round((time.monotonic() - state.updated_at) * 1000) if state.updated_at else None,
+    })
+    return description
+
+def handle_ipc_request(request, reply):
+    """Выполняет запрос API; возвращает ответ или None, если ответ будет отправлен через reply позже"""
+    command = request.get("cmd")
+    
+    if command == "ping":
+        return {"ok": True, "pid": os.getpid(), "monitors": len(g_monitors)}
+    
+    if command == "list":
+        return {"ok": True, "monitors": [describe_monitor(key) for key in resolve_monitor_keys("all")] if g_monitors else []}
+    
+    if command == "rescan":
+        refresh_monitors()
+        return {"ok": True}
+    
+    if command == "scenes":
+        return {"ok": True, "scenes": get_scenes()}
+    
+    if command == "scene":
+        name = request.get("name")
+        if not name:
+            raise ValueError("не указано имя сцены")
+        if request.get("save"):
+            return {"ok": True, "scene": name, "saved": save_scene(name)}
+        plan = apply_scene(name)
+        return {"ok": True, "scene": name, "monitors": [dict(values, monitor=g_monitors[key]["index"] + 1) for key, values in plan.items()]}
+    
+    if command == "get":
+        monitor_keys = resolve_monitor_keys(request.get("monitor"))
+        stale = [key for key in monitor_keys if g_monitor_states[key].is_stale(MONITOR_STATE_MAX_AGE_MS)]
+        if not stale:
+            return {"ok": True, "monitors": [describe_monitor(key) for key in monitor_keys]}
+        
+        # Устаревшие состояния перечитываем и отвечаем, когда придут все результаты
+        remaining = set(stale)
+        def on_polled(monitor_key):
+            remaining.discard(monitor_key)
+            if not remaining:
+                reply({"ok": True, "monitors": [describe_monitor(key) for key in monitor_keys if key in g_monitors]})
+        for monitor_key in stale:
+            g_state_waiters.setdefault(monitor_key, []).append(on_polled)
+            if not poll_monitor(monitor_key):
+                # Идет анимация - отвечаем текущим известным состоянием
+                g_state_waiters[monitor_key].remove(on_polled)
+                on_polled(monitor_key)
+        return None
+    
+    if command == "set":
+        monitor_keys = resolve_monitor_keys(request.get("monitor"))
+        # Сначала проверяем все значения, потом пишем - запрос применяется целиком или не применяется
+        changes = []
+        for monitor_key in monitor_keys:
+            state = g_monitor_states[monitor_key]
+            values = {}
+            # Значения прошлого запуска (до первого чтения) для относительных изменений не годятся
+            read = state.updated_at > 0
+            for feature in VCP_FEATURES:
+                if feature.key not in request:
+                    continue
+                if feature.is_choice:
+                    values[feature.key] = feature.resolve_choice(request[feature.key])
+                    continue
+                animator = get_animator(monitor_key, feature.code)
+                current = getattr(state, feature.key) if read else None
+                if animator and animator.is_animating:
+                    current = animator.target_value
+                values[feature.key] = monitor_ipc.resolve_level(request[feature.key], current)
+            if not values:
+                raise ValueError(f"не указано, что менять ({', '.join(feature.key for feature in VCP_FEATURES)})")
+            changes.append((monitor_key, values))
+        
+        # Одинаковая яркость для всех мониторов - одна синхронная анимация
+        brightness_values = {values.get("brightness") for _, values in changes}
+        synchronized = len(changes) > 1 and len(brightness_values) == 1 and None not in brightness_values
+        if synchronized:
+            set_all_monitors_brightness(brightness_values.pop())
+        
+        for monitor_key, values in changes:
+            entry = g_monitors[monitor_key]
+            for key, value in values.items():
+                if key == "brightness" and synchronized:
+                    continue
+                set_monitor_feature(entry["monitor"], VCP_FEATURES_BY_KEY[key].code, value, entry["index"])
+        return {"ok": True, "monitors": [dict(values, monitor=g_monitors[key]["index"] + 1) for key, values in changes]}
+    
+    raise ValueError(f"неизвестная команда: {command}")
 
 def update_tray_icon_brightness(brightness=None):
     """Обновляет иконку в system tray с текущим уровнем яркости"""
-    global tray_icon_global
+    global tray_icon_global, g_tray_icon_level
     
     if tray_icon_global:
         try:
-            new_icon = create_dynamic_monitor_icon(brightness)
-            tray_icon_global.setIcon(new_icon)
+            # Иконка уже показывает этот уровень - ничего не делаем
+            if brightness == g_tray_icon_level:
+                return
+            g_tray_icon_level = brightness
+            
+            tray_icon_global.setIcon(get_brightness_icon(brightness))
             
             # Обновляем tooltip с информацией о яркости
             if brightness is not None:
@@ -783,43 +3075,154 @@ def update_tray_icon_brightness(brightness=None):
             tray_icon_global.setToolTip(tooltip)
             
         except Exception as e:
-            print(f"⚠️  Ошибка обновления иконки: {e}")
+            ui_log.warning("⚠️  Ошибка обновления иконки: %s", e)
 
-def main():
-    """Основная функция"""
-    global tray_icon_global, monitors_global, update_timer, ui_updater_global
-    
-    print("=== Monitor Control - Основная версия ===")
-    print()
-    
-    # Шаг 1: Проверяем GUI
-    print("1. Проверяем GUI окружение...")
-    if not os.environ.get('DISPLAY'):
-        print("❌ Ошибка: DISPLAY не установлен")
+def print_stats(path=STATS_FILE):
+    """Выводит снимок статистики задержек DDC, сохраненный работающим приложением (--stats)"""
+    try:
+        with open(path, 'r') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ Статистика еще не сохранена ({path}), запустите приложение")
+        return 1
+    except Exception as e:
+        print(f"❌ Ошибка чтения статистики: {e}")
         return 1
     
-    app = QApplication(sys.argv)
-    app.setQuitOnLastWindowClosed(False)
+    age = time.time() - snapshot.get("generated_at", 0)
+    uptime_s = snapshot.get("uptime_s") or 0
+    print(f"📊 Статистика DDC/CI (снимок {age:.0f} сек назад, время работы {uptime_s:.0f} сек)")
+    if not snapshot.get("monitors"):
+        print("   Нет данных")
+    
+    def ms(value):
+        return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+    
+    for name, monitor in snapshot.get("monitors", {}).items():
+        busy_share = monitor["busy_ms"] / (uptime_s * 10) if uptime_s else 0
+        print()
+        transport = f", {monitor['transport']}" if monitor.get("transport") else ""
+        print(f"📺 {name} (i2c-{monitor.get('bus')}{transport}): шина занята {monitor['busy_ms'] / 1000:.1f} сек ({busy_share:.2f}%), задач {monitor['jobs']}, "
+              f"объединено записей {monitor.get('coalesced', 0)}")
+        health = monitor.get("health")
+        if health:
+            print(f"   надежность: доля неудачных попыток {health['failure_rate'] * 100:.1f}%, замедление ×{health['pacing']:.2f}")
+        print(f"   {'операция':<30}{'вызовов':>8}{'ошибок':>8}{'повторов':>9}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}{'max ms':>8}")
+        for operation, stats in monitor.get("operations", {}).items():
+            print(f"   {operation:<30}{stats['count']:>8}{stats['errors']:>8}{stats['retries']:>9}"
+                  f"{ms(stats['p50_ms'])}{ms(stats['p95_ms'])}{ms(stats['p99_ms'])}{ms(stats['max_ms'])}")
+        for key, stats in monitor.get("animations", {}).items():
+            print(f"   анимация {key}: {stats['count']}, длительность p50 {stats['p50_ms']:.0f} мс (цель {TARGET_ANIMATION_DURATION_MS} мс), "
+                  f"отклонение p95 {stats['error_p95_ms']:.0f} мс, записей в среднем {stats['writes_avg']}")
+    return 0
+
+def parse_args(argv):
+    """Разбирает параметры командной строки (неизвестные параметры остаются для Qt)"""
+    parser = argparse.ArgumentParser(description="Monitor Control - управление мониторами через DDC/CI")
+    parser.add_argument("--stats", action="store_true", help="показать статистику задержек DDC и выйти")
+    parser.add_argument("--daemon", action="store_true", help="запустить как службу без трея (управление через API)")
+    parser.add_argument("--log-level", default=os.environ.get("MONITOR_CONTROL_LOG_LEVEL", DEFAULT_LOG_LEVEL),
+                        type=str.upper, choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+                        help="уровень журнала (DEBUG выводит каждый кадр анимации)")
+    parser.add_argument("--log-file", default=os.environ.get("MONITOR_CONTROL_LOG_FILE"),
+                        help="дополнительно писать журнал в файл с ротацией")
+    parser.add_argument("--simulate", default=monitor_sim.get_spec(), metavar="N|FILE",
+                        help="имитировать N мониторов или мониторы из JSON-файла (в том числе трассы) вместо настоящих шин I2C")
+    parser.add_argument("--transport", default=os.environ.get("MONITOR_CONTROL_TRANSPORT", DDC_TRANSPORT),
+                        choices=["auto", "i2c-dev", "monitorcontrol"], help="транспорт DDC/CI для найденных мониторов")
+    parser.add_argument("--record-trace", default=os.environ.get("MONITOR_CONTROL_TRACE"), metavar="FILE",
+                        help="записывать задержки операций DDC в файл трассы для воспроизведения в --simulate")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+def setup_logging(level=DEFAULT_LOG_LEVEL, log_file=None):
+    """Настраивает журнал приложения: вывод в терминал и, при необходимости, файл с ротацией"""
+    log.setLevel(level)
+    log.propagate = False
+    for handler in list(log.handlers):
+        log.removeHandler(handler)
+    
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            os.path.expanduser(log_file), maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUP_COUNT, encoding="utf-8"))
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        log.addHandler(handler)
+
+def start_engine(app):
+    """Запускает движок мониторов: потоки DDC, опрос, горячее подключение, статистику и API.
+    
+    Общая часть для трея и режима службы (--daemon); мониторы подключаются после.
+    """
+    global poll_scheduler_global, ui_updater_global, ddc_engine_global, hotplug_watcher_global
+    global screen_lock_watcher_global, stats_timer_global, ipc_server_global
     
     # Создаем UI updater для безопасного обновления из потоков
     ui_updater_global = UIUpdater()
-    ui_updater_global.update_display.connect(update_brightness_display)
     ui_updater_global.update_icon.connect(update_tray_icon_brightness)
+    ui_updater_global.monitor_state.connect(apply_monitor_state)
+    ui_updater_global.monitor_polled.connect(on_monitor_polled)
+    ui_updater_global.monitors_scanned.connect(apply_monitor_scan)
+    
+    # Фоновый движок DDC/CI: весь ввод-вывод шины выполняется вне потока GUI
+    ddc_engine_global = DDCEngine(ui_updater_global)
+    app.aboutToQuit.connect(ddc_engine_global.shutdown)
+    # Несохраненные настройки записываем при выходе
+    app.aboutToQuit.connect(settings_store.flush)
+    
+    # Снимок статистики DDC для --stats: периодически и при выходе
+    stats_timer_global = QTimer()
+    stats_timer_global.timeout.connect(ddc_profiler.write_snapshot)
+    stats_timer_global.start(STATS_SNAPSHOT_INTERVAL_MS)
+    app.aboutToQuit.connect(ddc_profiler.write_snapshot)
+    
+    # Адаптивный опрос: редко для неизменных мониторов, часто после взаимодействия
+    poll_scheduler_global = PollScheduler(poll_monitor)
+    screen_lock_watcher_global = ScreenLockWatcher()
+    screen_lock_watcher_global.locked_changed.connect(poll_scheduler_global.set_screen_locked)
+    
+    # Подключение и отключение мониторов (док-станция) обновляет только их разделы
+    hotplug_watcher_global = HotplugWatcher()
+    hotplug_watcher_global.monitors_changed.connect(refresh_monitors)
+    
+    # Локальный API для скриптов и CLI
+    ipc_server_global = IPCServer()
+    ipc_server_global.listen()
+    app.aboutToQuit.connect(ipc_server_global.close)
+
+def run_daemon():
+    """Режим службы (--daemon): движок и API без трея, DISPLAY не нужен"""
+    log.info("=== Monitor Control - служба ===")
     
-    if not QSystemTrayIcon.isSystemTrayAvailable():
-        print("❌ Ошибка: System tray недоступен")
+    if monitor_ipc.is_running():
+        log.error("❌ Monitor Control уже запущен, шиной управляет он (%s)", monitor_ipc.socket_path())
         return 1
     
-    print("✅ GUI окружение готово")
+    app = QCoreApplication(sys.argv)
+    start_engine(app)
+    
+    log.info("Сканируем мониторы...")
+    register_monitors(probe_monitors(scan_monitors()))
     
-    # Шаг 2: Сканирование мониторов (импорт ВНУТРИ функции)
-    print("2. Сканируем мониторы...")
-    monitors = scan_monitors()
-    monitors_global = monitors
-    print()
+    # Корректное завершение по SIGTERM/SIGINT (systemd, Ctrl+C): сохраняем настройки и закрываем шину
+    signal.signal(signal.SIGTERM, lambda signum, frame: app.quit())
+    signal.signal(signal.SIGINT, lambda signum, frame: app.quit())
+    # Обработчики сигналов Python выполняются только между вызовами Python - периодически отдаем управление
+    signal_timer = QTimer()
+    signal_timer.timeout.connect(lambda: None)
+    signal_timer.start(500)
     
-    # Шаг 3: Создание system tray и МЕНЮ (ОДИН РАЗ)
-    print("3. Создаем system tray и меню...")
+    log.info("✅ Служба запущена, мониторов: %s", len(g_monitors))
+    return app.exec()
+
+def create_tray(app):
+    """Создает иконку в трее с меню и запускает фоновое сканирование мониторов (шаги 2-4 запуска)"""
+    global tray_icon_global
+    
+    # Шаг 2: Создание system tray и МЕНЮ (ОДИН РАЗ) - сразу, не дожидаясь шины
+    log.info("2. Создаем system tray и меню...")
     tray_icon = QSystemTrayIcon(create_monitor_icon(), app)
     tray_icon.setToolTip("Monitor Control - С анимацией и автообновлением")
     tray_icon_global = tray_icon
@@ -844,13 +3247,13 @@ def main():
     """)
     
     # Заполняем меню и сохраняем ссылки на его элементы
-    create_monitor_menus(menu, monitors)
+    create_monitor_menus(menu)
     
     # Служебные функции
     menu.addSeparator()
     
     refresh_action = menu.addAction("🔄 Обновить мониторы")
-    refresh_action.triggered.connect(lambda: refresh_monitors(tray_icon))
+    refresh_action.triggered.connect(lambda: refresh_monitors(tray_icon, reread_capabilities=True))
     
     quit_action = menu.addAction("❌ Выход")
     quit_action.triggered.connect(app.quit)
@@ -858,33 +3261,93 @@ def main():
     tray_icon.setContextMenu(menu)
     tray_icon.show()
     
+    # Шаг 3: Сканирование мониторов в фоне (импорт monitorcontrol и перечисление шин - в потоке),
+    # до его завершения меню показывает мониторы и яркость прошлого запуска
+    log.info("3. Сканируем мониторы в фоне...")
+    refresh_monitors(tray_icon)
+    
+    # Иконки всех уровней яркости отрисовываем после показа трея
+    if ICON_PRERENDER == "startup":
+        QTimer.singleShot(0, prerender_brightness_icons)
+    
     # Шаг 4: Настройка автоматического обновления
-    print("4. Настраиваем автоматическое обновление...")
-    update_timer = QTimer()
-    update_timer.timeout.connect(update_brightness_display)
-    update_timer.start(UPDATE_INTERVAL_MS)
-    print(f"✅ Автообновление настроено (каждые {UPDATE_INTERVAL_MS/1000} секунд)")
-    
-    print("✅ System tray создан и отображен")
-    
-    print()
-    print("✅ Приложение запущено успешно!")
-    print("📍 Проверьте системный трей для управления мониторами")
-    print("🎬 Включена адаптивная анимация изменения яркости")
-    print(f"🎯 Целевое время анимации: {TARGET_ANIMATION_DURATION_MS}ms ±{ANIMATION_TOLERANCE_MS}ms")
-    print(f"⚙️  Диапазон шагов: {MIN_ANIMATION_STEPS}-{MAX_ANIMATION_STEPS} (начальное: {DEFAULT_ANIMATION_STEPS})")
-    print("🔄 Включено автоматическое обновление меню")
-    print("🛑 Для выхода используйте меню в трее или нажмите Ctrl+C")
-    print()
+    log.info("4. Настраиваем автоматическое обновление...")
+    # При открытии меню перечитываем устаревшие состояния и опрашиваем, пока оно открыто
+    menu.aboutToShow.connect(update_brightness_display)
+    menu.aboutToShow.connect(lambda: poll_scheduler_global.set_menu_open(True))
+    menu.aboutToHide.connect(lambda: poll_scheduler_global.set_menu_open(False))
+    log.info("✅ Адаптивное обновление настроено (%s–%s секунд)", POLL_MIN_INTERVAL_MS/1000, POLL_MAX_INTERVAL_MS/1000)
+    
+    log.info("✅ System tray создан и отображен")
+    return tray_icon
+
+def main():
+    """Основная функция"""
+    global ddc_transport_global
+    
+    args = parse_args(sys.argv[1:])
+    
+    # Статистика работающего экземпляра не требует GUI
+    if args.stats:
+        return print_stats()
+    
+    setup_logging(args.log_level, args.log_file)
+    
+    if args.simulate:
+        # Сканирование читает режим имитации из окружения (в том числе из фоновых потоков)
+        os.environ[monitor_sim.SIMULATE_ENV] = args.simulate
+        log.info("🧪 Имитация мониторов: %s", args.simulate)
+    ddc_transport_global = args.transport
+    if args.record_trace:
+        # Трасса пишется вместе со снимком статистики: периодически и при выходе
+        ddc_profiler.trace_path = os.path.expanduser(args.record_trace)
+        log.info("📼 Запись трассы задержек DDC: %s", ddc_profiler.trace_path)
+    
+    if args.daemon:
+        return run_daemon()
+    
+    log.info("=== Monitor Control - Основная версия ===")
+    
+    # Шаг 1: Проверяем GUI
+    log.info("1. Проверяем GUI окружение...")
+    if not os.environ.get('DISPLAY'):
+        log.error("❌ Ошибка: DISPLAY не установлен")
+        return 1
+    
+    # Шиной владеет один процесс: второй экземпляр не запускаем
+    if monitor_ipc.is_running():
+        log.error("❌ Monitor Control уже запущен (%s)", monitor_ipc.socket_path())
+        return 1
+    
+    app = QApplication(sys.argv)
+    app.setQuitOnLastWindowClosed(False)
+    
+    if not QSystemTrayIcon.isSystemTrayAvailable():
+        log.error("❌ Ошибка: System tray недоступен")
+        return 1
+    
+    start_engine(app)
+    
+    log.info("✅ GUI окружение готово")
+    
+    create_tray(app)
+    
+    
+    log.info("✅ Приложение запущено успешно!")
+    log.info("📍 Проверьте системный трей для управления мониторами")
+    log.info("🎬 Включена адаптивная анимация изменения яркости")
+    log.info("🎯 Целевое время анимации: %sms ±%sms", TARGET_ANIMATION_DURATION_MS, ANIMATION_TOLERANCE_MS)
+    log.info("⚙️  Не более %s кадров за анимацию, пропуск кадров при медленной шине", MAX_ANIMATION_STEPS)
+    log.info("🔄 Включено автоматическое обновление меню")
+    log.info("🛑 Для выхода используйте меню в трее или нажмите Ctrl+C")
     
     try:
         return app.exec()
     except KeyboardInterrupt:
-        print("\n🛑 Прерывание пользователем")
+        log.info("🛑 Прерывание пользователем")
         return 0
     except Exception as e:
-        print(f"\n❌ Критическая ошибка: {e}")
-        traceback.print_exc()
+        log.critical("❌ Критическая ошибка: %s", e, exc_info=True)
         return 1
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Monitor Control - прямой транспорт DDC/CI через /dev/i2c-N.
+
+Реализует интерфейс monitorcontrol.vcp.VCP и подставляется внутрь обычного
+monitorcontrol.Monitor вместо LinuxVCP. Отличия от LinuxVCP:
+
+- открытие устройства не читает байт с шины;
+- ответ читается одной операцией I2C, а не заголовок и данные по отдельности;
+- контрольная сумма ответа проверяется (с виртуальным адресом 0x50 по
+  спецификации), испорченный ответ - VCPIOError, а не случайное значение;
+- пауза 50 мс между командами отсчитывается от конца предыдущей команды и
+  выдерживается только если следующая команда пришла раньше.
+
+Включается явно (DDC_TRANSPORT в monitor_control.py, --transport i2c-dev или auto), по
+умолчанию мониторы работают через monitorcontrol. Перед включением стоит сравнить
+задержки на своих мониторах: monitor_bench.py --transports.
+"""
+
+import os
+import time
+import fcntl
+
+import monitorcontrol.vcp
+
+I2C_SLAVE = 0x0703          # ioctl: адрес устройства для последующих read/write
+DDC_CI_ADDRESS = 0x37       # Адрес DDC/CI монитора на шине I2C
+HOST_ADDRESS = 0x51         # Адрес источника в запросах хоста
+REPLY_CHECKSUM_ADDRESS = 0x50  # Виртуальный адрес получателя, с которого начинается контрольная сумма ответа
+LENGTH_FLAG = 0x80          # Старший бит байта длины
+
+GET_VCP_REQUEST = 0x01
+GET_VCP_REPLY = 0x02
+SET_VCP_REQUEST = 0x03
+CAPABILITIES_REQUEST = 0xF3
+CAPABILITIES_REPLY = 0xE3
+
+GET_VCP_REPLY_SIZE = 11     # Источник, длина, 8 байт данных, контрольная сумма
+CAPABILITIES_REPLY_SIZE = 38  # Источник, длина, код, смещение (2), до 32 байт строки, контрольная сумма
+CAPABILITIES_MAX_FRAGMENTS = 64
+
+REPLY_DELAY_S = 0.04        # Ответ можно читать не раньше 40 мс после запроса
+COMMAND_INTERVAL_S = 0.05   # Между командами не меньше 50 мс
+
+def checksum(data, initial):
+    """Контрольная сумма DDC/CI: XOR всех байт пакета и адреса"""
+    result = initial
+    for byte in data:
+        result ^= byte
+    return result
+
+class I2CDevVCP:
+    """Панель управления монитора через /dev/i2c-N без промежуточных слоев"""
+
+    transport = "i2c-dev"
+
+    def __init__(self, bus_number):
+        self.bus_number = bus_number
+        self.path = f"/dev/i2c-{bus_number}"
+        self.fd = None
+        self.ready_at = 0.0  # Раньше этого момента (time.monotonic) следующую команду отправлять нельзя
+
+    def __enter__(self):
+        try:
+            fd = os.open(self.path, os.O_RDWR)
+        except PermissionError as e:
+            raise monitorcontrol.vcp.VCPPermissionError(f"нет доступа к {self.path}") from e
+        except OSError as e:
+            raise monitorcontrol.vcp.VCPIOError(f"не удалось открыть {self.path}") from e
+        try:
+            fcntl.ioctl(fd, I2C_SLAVE, DDC_CI_ADDRESS)
+        except OSError as e:
+            os.close(fd)
+            raise monitorcontrol.vcp.VCPIOError(f"не удалось выбрать адрес DDC/CI на {self.path}") from e
+        self.fd = fd
+        return self
+
+    def __exit__(self, exception_type, exception_value, exception_traceback):
+        if self.fd is not None:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = None
+        return False
+
+    def _send(self, payload):
+        """Отправляет запрос, выдержав паузу после предыдущей команды"""
+        delay = self.ready_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        packet = bytes([HOST_ADDRESS, LENGTH_FLAG | len(payload)]) + bytes(payload)
+        packet += bytes([checksum(packet, DDC_CI_ADDRESS << 1)])
+        try:
+            os.write(self.fd, packet)
+        except OSError as e:
+            raise monitorcontrol.vcp.VCPIOError(f"ошибка записи в {self.path}") from e
+        finally:
+            self.ready_at = time.monotonic() + COMMAND_INTERVAL_S
+
+    def _receive(self, size, reply_code):
+        """Читает ответ одной операцией I2C и возвращает его данные после кода ответа"""
+        time.sleep(REPLY_DELAY_S)
+        try:
+            reply = os.read(self.fd, size)
+        except OSError as e:
+            raise monitorcontrol.vcp.VCPIOError(f"ошибка чтения из {self.path}") from e
+        finally:
+            self.ready_at = time.monotonic() + COMMAND_INTERVAL_S
+
+        if len(reply) < 3:
+            raise monitorcontrol.vcp.VCPIOError(f"короткий ответ: {len(reply)} байт")
+        length = reply[1] & ~LENGTH_FLAG
+        if length == 0:
+            # Пустое сообщение: монитор занят и просит повторить запрос
+            raise monitorcontrol.vcp.VCPIOError("монитор занят (пустой ответ)")
+        if length + 3 > len(reply):
+            raise monitorcontrol.vcp.VCPIOError(f"неверная длина ответа: {length}")
+        if checksum(reply[:length + 2], REPLY_CHECKSUM_ADDRESS) != reply[length + 2]:
+            raise monitorcontrol.vcp.VCPIOError("неверная контрольная сумма ответа")
+        if reply[2] != reply_code:
+            raise monitorcontrol.vcp.VCPIOError(f"неожиданный код ответа: 0x{reply[2]:02X}")
+        return reply[3:length + 2]
+
+    def get_vcp_feature(self, code):
+        self._send([GET_VCP_REQUEST, code])
+        data = self._receive(GET_VCP_REPLY_SIZE, GET_VCP_REPLY)
+        if len(data) < 7:
+            raise monitorcontrol.vcp.VCPIOError(f"короткий ответ на чтение 0x{code:02X}")
+        result, opcode = data[0], data[1]
+        if opcode != code:
+            raise monitorcontrol.vcp.VCPIOError(f"ответ для другого кода: 0x{opcode:02X}")
+        if result != 0:
+            raise monitorcontrol.vcp.VCPIOError(f"код 0x{code:02X} не поддерживается")
+        maximum = (data[3] << 8) | data[4]
+        current = (data[5] << 8) | data[6]
+        return current, maximum
+
+    def set_vcp_feature(self, code, value):
+        self._send([SET_VCP_REQUEST, code, (value >> 8) & 0xFF, value & 0xFF])
+
+    def get_vcp_capabilities(self):
+        fragments = []
+        offset = 0
+        for _ in range(CAPABILITIES_MAX_FRAGMENTS):
+            self._send([CAPABILITIES_REQUEST, (offset >> 8) & 0xFF, offset & 0xFF])
+            data = self._receive(CAPABILITIES_REPLY_SIZE, CAPABILITIES_REPLY)
+            if len(data) < 2:
+                raise monitorcontrol.vcp.VCPIOError("короткий фрагмент строки возможностей")
+            if ((data[0] << 8) | data[1]) != offset:
+                raise monitorcontrol.vcp.VCPIOError("фрагмент строки возможностей с другим смещением")
+            chunk = data[2:]
+            if not chunk:
+                return b"".join(fragments).decode("ascii", errors="replace").rstrip("\x00")
+            fragments.append(chunk)
+            offset += len(chunk)
+        raise monitorcontrol.vcp.VCPIOError("строка возможностей не закончилась")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Monitor Control - локальный API работающего экземпляра.
+
+Протокол: Unix-сокет, по одному JSON-объекту на строку в каждую сторону.
+Модуль не импортирует PyQt6, чтобы клиенты (CLI, скрипты горячих клавиш)
+запускались за миллисекунды.
+
+Запросы:
+    {"cmd": "ping"}
+    {"cmd": "list"}                                   - все мониторы (известное состояние)
+    {"cmd": "get", "monitor": 1}                      - состояние монитора (перечитывается, если устарело)
+    {"cmd": "set", "monitor": 1, "brightness": 70}    - monitor: номер, идентификатор EDID или "all"
+    {"cmd": "set", "monitor": 1, "brightness": "+10"} - относительное изменение
+    {"cmd": "set", "monitor": 1, "volume": 50, "input": "HDMI-1"}
+    {"cmd": "set", "monitor": 1, "contrast": 60, "color_preset": "sRGB"}
+    {"cmd": "rescan"}
+    {"cmd": "scenes"}                                 - сцены из настроек
+    {"cmd": "scene", "name": "Презентация"}           - применить сцену
+    {"cmd": "scene", "name": "Игры", "save": true}    - сохранить текущие значения мониторов как сцену
+
+Ответ: {"ok": true, ...} или {"ok": false, "error": "..."}
+"""
+
+import os
+import json
+import socket
+
+SOCKET_NAME = "monitor-control.sock"
+IPC_TIMEOUT_S = 5.0  # Чтение состояния монитора по DDC может занять до пары секунд
+
+# Коды VCP
+VCP_AUDIO_VOLUME = 0x62
+
+# Названия входов (VCP 0x60)
+INPUT_NAMES = {
+    15: "DP-1",
+    17: "HDMI-1",
+    18: "HDMI-2",
+    25: "Type-C",  # Некоторые мониторы используют этот код для USB-C
+}
+
+class IPCError(Exception):
+    """Ошибка обмена с работающим экземпляром"""
+
+class NotRunningError(IPCError):
+    """Работающий экземпляр не найден"""
+
+def socket_path():
+    """Путь к сокету: в $XDG_RUNTIME_DIR (доступен только пользователю) или в /tmp"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, SOCKET_NAME)
+    return f"/tmp/monitor-control-{os.getuid()}.sock"
+
+def encode_message(message):
+    """Кодирует сообщение в строку протокола"""
+    return json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+
+def decode_message(line):
+    """Декодирует строку протокола"""
+    message = json.loads(line.decode("utf-8"))
+    if not isinstance(message, dict):
+        raise ValueError("ожидался JSON-объект")
+    return message
+
+def send_request(request, timeout=IPC_TIMEOUT_S, path=None):
+    """Отправляет запрос работающему экземпляру и возвращает ответ"""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        try:
+            client.connect(path or socket_path())
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise NotRunningError("Monitor Control не запущен") from e
+
+        client.sendall(encode_message(request))
+        buffer = b""
+        while b"\n" not in buffer:
+            chunk = client.recv(65536)
+            if not chunk:
+                raise IPCError("соединение закрыто до ответа")
+            buffer += chunk
+        return decode_message(buffer.split(b"\n", 1)[0])
+    except socket.timeout as e:
+        raise IPCError("нет ответа от Monitor Control") from e
+    except ValueError as e:
+        raise IPCError(f"некорректный ответ: {e}") from e
+    finally:
+        client.close()
+
+def is_running(path=None):
+    """Отвечает ли работающий экземпляр на ping"""
+    try:
+        return send_request({"cmd": "ping"}, timeout=1.0, path=path).get("ok", False)
+    except IPCError:
+        return False
+
+def get_input_name(input_code):
+    """Возвращает название входа по коду"""
+    return INPUT_NAMES.get(input_code, f"Вход {input_code}")
+
+def resolve_input_code(value):
+    """Код входа по числу или названию ("HDMI-1", "hdmi1")"""
+    if isinstance(value, int) or str(value).isdigit():
+        return int(value)
+    wanted = str(value).lower().replace("-", "")
+    for code, name in INPUT_NAMES.items():
+        if name.lower().replace("-", "") == wanted:
+            return code
+    raise ValueError(f"неизвестный вход: {value}")
+
+def resolve_level(value, current):
+    """Абсолютное (70) или относительное ("+10", "-10") значение в диапазоне 0..100"""
+    if isinstance(value, str) and value[:1] in "+-":
+        if current is None:
+            raise ValueError("текущее значение еще не прочитано, относительное изменение невозможно")
+        value = current + int(value)
+    return max(0, min(100, int(value)))
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Monitor Control - имитация мониторов DDC/CI для проверки без железа.
+
+    MONITOR_CONTROL_SIMULATE=2 python3 monitor_control.py        # два монитора по умолчанию
+    python3 monitor_control.py --simulate monitors.json          # мониторы из файла
+
+Имитируется только шина: SimulatedVCP подставляется вместо LinuxVCP внутрь
+обычного monitorcontrol.Monitor, поэтому приложение (аниматор, опрос, чтение
+возможностей, меню) работает с ним без изменений.
+
+Файл конфигурации - JSON со списком мониторов, все поля необязательны:
+
+    {"monitors": [{
+        "model": "SIM-27",
+        "features": {"0x10": 50, "0x12": 70, "0x62": 30,
+                     "0x14": {"value": 5, "choices": [1, 5, 6, 8]},
+                     "0x60": {"value": 15, "choices": [15, 17, 18]}},
+        "latency_ms": {"get": [40, 5], "set": [50, 10], "capabilities": [900, 100],
+                       "open": {"samples": [0.2, 0.3, 1.5]}},
+        "error_rate": {"get": 0.02, "set": 0.05},
+        "input_switch": {"blackout_ms": 1500, "ignore_unsupported": true},
+        "script": [{"at_ms": 10000, "code": "0x10", "value": 80}]
+    }]}
+
+latency_ms - задержка операции: [среднее, стандартное отклонение] или
+{"samples": [...]} (значения выбираются случайно, например из записанной трассы).
+error_rate - доля операций, на которые монитор отвечает NAK (VCPIOError).
+input_switch.blackout_ms - сколько монитор не отвечает после переключения входа.
+script - изменения "кнопками монитора" через at_ms после создания.
+
+Вместо конфигурации можно передать трассу задержек, записанную на настоящих
+мониторах (monitor_control.py --record-trace FILE): задержки и доля отказов
+каждой операции воспроизводятся по записанным значениям.
+"""
+
+import os
+import json
+import time
+import random
+import threading
+
+SIMULATE_ENV = "MONITOR_CONTROL_SIMULATE"
+SIMULATED_BUS_BASE = 900  # Номера шин имитации не пересекаются с настоящими /dev/i2c-N
+
+# Коды VCP
+VCP_BRIGHTNESS = 0x10
+VCP_INPUT_SOURCE = 0x60
+
+DEFAULT_FEATURES = {
+    0x10: {"value": 50},
+    0x12: {"value": 70},
+    0x14: {"value": 5, "choices": [1, 5, 6, 8]},
+    0x60: {"value": 15, "choices": [15, 17, 18]},
+    0x62: {"value": 30},
+}
+
+DEFAULT_LATENCY_MS = {
+    "open": [0.2, 0.05],
+    "get": [40.0, 5.0],          # Ответ на чтение: пауза 40 мс по спецификации DDC/CI
+    "set": [50.0, 5.0],          # Запись и обязательная пауза 50 мс
+    "capabilities": [900.0, 100.0],  # Строка возможностей читается фрагментами
+}
+
+g_simulated_vcps = {}  # Конфигурация -> созданные панели мониторов
+
+class LatencyModel:
+    """Задержка одной операции: нормальное распределение или выборка из записанных значений"""
+
+    def __init__(self, spec, rng):
+        self.rng = rng
+        self.samples = None
+        self.mean_ms = 0.0
+        self.stddev_ms = 0.0
+        if isinstance(spec, dict):
+            self.samples = [float(sample) for sample in spec.get("samples", [])] or None
+            self.mean_ms = float(spec.get("mean", 0.0))
+            self.stddev_ms = float(spec.get("stddev", 0.0))
+        elif isinstance(spec, (list, tuple)):
+            self.mean_ms = float(spec[0])
+            self.stddev_ms = float(spec[1]) if len(spec) > 1 else 0.0
+        elif spec is not None:
+            self.mean_ms = float(spec)
+
+    def sample_ms(self):
+        if self.samples:
+            return self.rng.choice(self.samples)
+        return max(0.0, self.rng.gauss(self.mean_ms, self.stddev_ms))
+
+def parse_code(code):
+    """Код VCP из JSON: 16, "16" или "0x10" """
+    return int(code, 0) if isinstance(code, str) else int(code)
+
+class SimulatedVCP:
+    """Виртуальная панель управления монитора с задержками, отказами и сценарием изменений.
+
+    Интерфейс совпадает с monitorcontrol.vcp.VCP. Шина одна на монитор: операции
+    выполняются под блокировкой, как на настоящем /dev/i2c.
+    """
+
+    transport = "sim"
+
+    def __init__(self, bus_number, config=None, seed=None):
+        import monitorcontrol.vcp
+        self.errors = monitorcontrol.vcp
+
+        config = config or {}
+        self.bus_number = bus_number
+        self.model = config.get("model", f"SIM-{bus_number - SIMULATED_BUS_BASE + 1}")
+        self.rng = random.Random(seed if seed is not None else bus_number)
+        self.lock = threading.Lock()
+        self.created_at = time.monotonic()
+
+        # Значения и допустимые варианты кодов VCP
+        self.values = {}
+        self.maximums = {}
+        self.choices = {}
+        for code, spec in (config.get("features") or DEFAULT_FEATURES).items():
+            code = parse_code(code)
+            spec = spec if isinstance(spec, dict) else {"value": spec}
+            self.values[code] = int(spec.get("value", 0))
+            self.maximums[code] = int(spec.get("max", 100))
+            if "choices" in spec:
+                self.choices[code] = [int(choice) for choice in spec["choices"]]
+
+        latency = dict(DEFAULT_LATENCY_MS, **(config.get("latency_ms") or {}))
+        self.latency = {operation: LatencyModel(spec, self.rng) for operation, spec in latency.items()}
+        self.error_rate = {operation: float(rate) for operation, rate in (config.get("error_rate") or {}).items()}
+        self.capabilities = config.get("capabilities")
+
+        input_switch = config.get("input_switch") or {}
+        self.blackout_s = float(input_switch.get("blackout_ms", 0)) / 1000.0
+        self.ignore_unsupported_input = bool(input_switch.get("ignore_unsupported", True))
+        self.blackout_until = 0.0
+
+        self.script = sorted(
+            ({"at": float(step["at_ms"]) / 1000.0, "code": parse_code(step["code"]), "value": int(step["value"])}
+             for step in config.get("script") or []),
+            key=lambda step: step["at"],
+        )
+
+        # Счетчики транзакций по операциям (для бенчмарков)
+        self.transactions = {"open": 0, "get": 0, "set": 0, "capabilities": 0}
+        self.naks = 0
+        self.is_open = False
+
+    def _transaction(self, operation):
+        """Задержка операции и, с заданной вероятностью или во время переключения входа, отказ"""
+        self.transactions[operation] += 1
+        time.sleep(self.latency[operation].sample_ms() / 1000.0)
+        # Открытие устройства не обращается к монитору, поэтому переключение входа на него не влияет
+        blackout = operation != "open" and time.monotonic() < self.blackout_until
+        if blackout or self.rng.random() < self.error_rate.get(operation, 0.0):
+            self.naks += 1
+            raise self.errors.VCPIOError(f"имитация: нет ответа ({operation})")
+
+    def _apply_script(self):
+        """Применяет изменения "кнопками монитора", время которых наступило"""
+        elapsed = time.monotonic() - self.created_at
+        while self.script and self.script[0]["at"] <= elapsed:
+            step = self.script.pop(0)
+            self.values[step["code"]] = step["value"]
+
+    def __enter__(self):
+        with self.lock:
+            self._transaction("open")
+            self.is_open = True
+        return self
+
+    def __exit__(self, exception_type, exception_value, exception_traceback):
+        self.is_open = False
+        return False
+
+    def get_vcp_feature(self, code):
+        with self.lock:
+            self._apply_script()
+            self._transaction("get")
+            if code not in self.values:
+                raise self.errors.VCPIOError(f"имитация: код 0x{code:02X} не поддерживается")
+            return self.values[code], self.maximums[code]
+
+    def set_vcp_feature(self, code, value):
+        with self.lock:
+            self._apply_script()
+            self._transaction("set")
+            if code not in self.values:
+                raise self.errors.VCPIOError(f"имитация: код 0x{code:02X} не поддерживается")
+            if code in self.choices and value not in self.choices[code] and self.ignore_unsupported_input:
+                return  # Монитор молча игнорирует неподдерживаемое значение
+            self.values[code] = max(0, min(self.maximums[code], int(value))) if code not in self.choices else int(value)
+            if code == VCP_INPUT_SOURCE:
+                # После переключения входа монитор какое-то время не отвечает по DDC/CI
+                self.blackout_until = time.monotonic() + self.blackout_s
+
+    def get_vcp_capabilities(self):
+        with self.lock:
+            self._transaction("capabilities")
+            if self.capabilities:
+                return self.capabilities
+            vcp = " ".join(
+                f"{code:02X}" + (f"({' '.join(f'{choice:02X}' for choice in self.choices[code])})" if code in self.choices else "")
+                for code in sorted(self.values)
+            )
+            return f"(prot(monitor)type(LCD)model({self.model})cmds(01 02 03 07 0C E3 F3)vcp({vcp})mccs_ver(2.1))"
+
+    def stats(self):
+        """Число транзакций по операциям и отказов"""
+        return dict(self.transactions, naks=self.naks)
+
+def trace_operation(operation):
+    """Операция имитации для операции из трассы: get_luminance -> get, set_vcp_feature:0x10 -> set"""
+    if operation in ("open", "get_vcp_capabilities"):
+        return "capabilities" if operation == "get_vcp_capabilities" else "open"
+    if operation.startswith("get_"):
+        return "get"
+    if operation.startswith("set_"):
+        return "set"
+    return None
+
+def config_from_trace(trace):
+    """Конфигурация имитации из трассы задержек (monitor_control.py --record-trace).
+
+    Задержки каждой операции выбираются из записанных значений, доля NAK - доля
+    неудачных попыток в трассе. Значения кодов VCP - по умолчанию.
+    """
+    monitors = []
+    for name, recorded in trace.get("monitors", {}).items():
+        samples = {}
+        counts = {}
+        for operation, stats in recorded.get("operations", {}).items():
+            sim_operation = trace_operation(operation)
+            if sim_operation is None:
+                continue
+            samples.setdefault(sim_operation, []).extend(stats.get("samples", []))
+            count, errors = counts.get(sim_operation, (0, 0))
+            counts[sim_operation] = (count + stats.get("count", 0), errors + stats.get("errors", 0))
+        monitors.append({
+            "model": name,
+            "latency_ms": {operation: {"samples": values} for operation, values in samples.items() if values},
+            "error_rate": {operation: errors / count for operation, (count, errors) in counts.items() if count},
+        })
+    return {"monitors": monitors}
+
+def load_config(spec):
+    """Конфигурация имитации: число мониторов ("2"), путь к JSON-файлу или к трассе задержек"""
+    spec = str(spec).strip()
+    if spec.isdigit():
+        return {"monitors": [{} for _ in range(int(spec))]}
+    with open(os.path.expanduser(spec), 'r') as f:
+        config = json.load(f)
+    if isinstance(config, list):
+        config = {"monitors": config}
+    elif isinstance(config.get("monitors"), dict):
+        # Трасса: мониторы по идентификатору с записанными задержками
+        config = config_from_trace(config)
+    return config
+
+def get_monitors(spec):
+    """Мониторы monitorcontrol поверх имитированных шин.
+
+    Панели создаются один раз на конфигурацию: повторное сканирование (горячее
+    подключение) видит те же мониторы с их текущими значениями, как на железе.
+    """
+    import monitorcontrol
+
+    if spec not in g_simulated_vcps:
+        config = load_config(spec)
+        seed = config.get("seed")
+        g_simulated_vcps[spec] = [
+            SimulatedVCP(SIMULATED_BUS_BASE + i, monitor_config, None if seed is None else seed + i)
+            for i, monitor_config in enumerate(config.get("monitors", []))
+        ]
+    return [monitorcontrol.Monitor(vcp) for vcp in g_simulated_vcps[spec]]
+
+def get_spec():
+    """Включена ли имитация (переменная окружения MONITOR_CONTROL_SIMULATE)"""
+    return os.environ.get(SIMULATE_ENV) or None
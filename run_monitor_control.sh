@@ -103,7 +103,7 @@ echo "✅ Все модули импортируются успешно"
 
 # Запускаем приложение
 echo "🎯 Запускаем Monitor Control..."
-python monitor_control.py
+python monitor_control.py "$@"
 
 # При ошибке показываем уведомление
 if [ $? -ne 0 ]; then
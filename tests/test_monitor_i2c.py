@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Проверка протокола DDC/CI в monitor_i2c: запросы сверяются побайтно, ответы
+монитора подставляются вместо os.read, шина и паузы не используются.
+
+    python3 -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import monitorcontrol.vcp
+import monitor_i2c
+
+MONITOR_ADDRESS = 0x6E  # Источник в ответах монитора
+
+def reply(payload, corrupt=False):
+    """Ответ монитора: источник, длина, данные и контрольная сумма от виртуального адреса 0x50"""
+    packet = bytes([MONITOR_ADDRESS, monitor_i2c.LENGTH_FLAG | len(payload)]) + bytes(payload)
+    check = monitor_i2c.checksum(packet, monitor_i2c.REPLY_CHECKSUM_ADDRESS)
+    return packet + bytes([check ^ 0xFF if corrupt else check])
+
+def vcp_reply(code, current, maximum, result=0, opcode=None):
+    """Ответ на чтение кода VCP"""
+    return reply([monitor_i2c.GET_VCP_REPLY, result, code if opcode is None else opcode, 0x00,
+                  maximum >> 8, maximum & 0xFF, current >> 8, current & 0xFF])
+
+def capabilities_reply(offset, text):
+    """Фрагмент строки возможностей со смещения offset"""
+    return reply([monitor_i2c.CAPABILITIES_REPLY, offset >> 8, offset & 0xFF] + list(text))
+
+class ScriptedBus:
+    """Шина с заранее заданными ответами: записи запоминаются, чтения берутся из списка"""
+    
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.writes = []
+        
+    def write(self, fd, data):
+        self.writes.append(bytes(data))
+        return len(data)
+    
+    def read(self, fd, size):
+        return self.replies.pop(0)[:size]
+
+class I2CDevVCPTest(unittest.TestCase):
+    
+    def open_vcp(self, *replies):
+        """Панель с открытым устройством поверх ScriptedBus"""
+        self.bus = ScriptedBus(replies)
+        for name, replacement in (("os.write", self.bus.write), ("os.read", self.bus.read), ("time.sleep", lambda seconds: None)):
+            patcher = mock.patch(f"monitor_i2c.{name}", replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        vcp = monitor_i2c.I2CDevVCP(5)
+        vcp.fd = 3
+        return vcp
+    
+    def test_get_vcp_feature(self):
+        vcp = self.open_vcp(vcp_reply(0x10, 42, 100))
+        self.assertEqual(vcp.get_vcp_feature(0x10), (42, 100))
+        self.assertEqual(self.bus.writes, [bytes([0x51, 0x82, 0x01, 0x10, 0xAC])])
+        
+    def test_set_vcp_feature(self):
+        vcp = self.open_vcp()
+        vcp.set_vcp_feature(0x10, 0x132)
+        self.assertEqual(self.bus.writes, [bytes([0x51, 0x84, 0x03, 0x10, 0x01, 0x32, 0x9B])])
+        
+    def test_bad_checksum(self):
+        vcp = self.open_vcp(reply(vcp_reply(0x10, 42, 100)[2:-1], corrupt=True))
+        with self.assertRaisesRegex(monitorcontrol.vcp.VCPIOError, "контрольная сумма"):
+            vcp.get_vcp_feature(0x10)
+            
+    def test_null_message_means_busy(self):
+        vcp = self.open_vcp(reply([]) + bytes(8))
+        with self.assertRaisesRegex(monitorcontrol.vcp.VCPIOError, "занят"):
+            vcp.get_vcp_feature(0x10)
+            
+    def test_wrong_opcode(self):
+        vcp = self.open_vcp(vcp_reply(0x10, 42, 100, opcode=0x12))
+        with self.assertRaisesRegex(monitorcontrol.vcp.VCPIOError, "другого кода"):
+            vcp.get_vcp_feature(0x10)
+            
+    def test_wrong_reply_code(self):
+        vcp = self.open_vcp(capabilities_reply(0, b"(vcp("))
+        with self.assertRaisesRegex(monitorcontrol.vcp.VCPIOError, "код ответа"):
+            vcp.get_vcp_feature(0x10)
+            
+    def test_unsupported_code(self):
+        vcp = self.open_vcp(vcp_reply(0x10, 0, 0, result=1))
+        with self.assertRaisesRegex(monitorcontrol.vcp.VCPIOError, "не поддерживается"):
+            vcp.get_vcp_feature(0x10)
+            
+    def test_capabilities_fragments(self):
+        text = b"(prot(monitor)type(LCD)model(TEST)cmds(01 02 03)vcp(10 12 60(0F 11)))"
+        fragments = [text[:32], text[32:64], text[64:]]
+        offsets = [0, 32, 64, len(text)]
+        vcp = self.open_vcp(*[capabilities_reply(offset, fragment) for offset, fragment in zip(offsets, fragments + [b""])])
+        self.assertEqual(vcp.get_vcp_capabilities(), text.decode("ascii"))
+        self.assertEqual([(write[3] << 8) | write[4] for write in self.bus.writes], offsets)
+        self.assertTrue(all(write[:3] == bytes([0x51, 0x83, 0xF3]) for write in self.bus.writes))
+        
+    def test_capabilities_wrong_offset(self):
+        vcp = self.open_vcp(capabilities_reply(0, b"(prot(monitor)"), capabilities_reply(0, b"(prot(monitor)"))
+        with self.assertRaisesRegex(monitorcontrol.vcp.VCPIOError, "смещением"):
+            vcp.get_vcp_capabilities()
+            
+    def test_command_interval(self):
+        vcp = self.open_vcp(vcp_reply(0x10, 42, 100))
+        sleeps = []
+        with mock.patch("monitor_i2c.time.sleep", sleeps.append), mock.patch("monitor_i2c.time.monotonic", return_value=100.0):
+            vcp.ready_at = 100.02
+            vcp.get_vcp_feature(0x10)
+        self.assertAlmostEqual(sleeps[0], 0.02)
+        self.assertEqual(sleeps[1], monitor_i2c.REPLY_DELAY_S)
+        self.assertEqual(vcp.ready_at, 100.0 + monitor_i2c.COMMAND_INTERVAL_S)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Проверка сцен monitor_control: план применения, проверка сцен из настроек и
+пропуск записей по теневому состоянию. Мониторы - monitor_sim без задержек,
+задачи выполняются сразу, без потоков DDC.
+
+    python3 -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import monitorcontrol
+import monitor_control
+import monitor_sim
+
+NO_LATENCY = {operation: [0, 0] for operation in ("open", "get", "set", "capabilities")}
+
+class SceneTest(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        store = monitor_control.SettingsStore(os.path.join(directory.name, "settings.json"), flush_delay_ms=3600 * 1000)
+        
+        self.vcps = []
+        monitors = {}
+        states = {}
+        for i, identity in enumerate(("SIM-A", "SIM-B")):
+            vcp = monitor_sim.SimulatedVCP(monitor_sim.SIMULATED_BUS_BASE + i, {"latency_ms": NO_LATENCY}, seed=i)
+            self.vcps.append(vcp)
+            session = monitor_control.MonitorSession(monitorcontrol.Monitor(vcp))
+            monitor_key = f"monitor_{i}"
+            monitors[monitor_key] = {"monitor": session, "index": i, "identity": identity}
+            states[monitor_key] = monitor_control.MonitorState()
+            states[monitor_key].update({"brightness": vcp.values[monitor_sim.VCP_BRIGHTNESS], "volume": 30})
+        
+        # Задача сцены выполняется сразу в тесте, а не в потоке монитора
+        def submit(monitor, monitor_index, job, error_message, key=None):
+            job(monitor)
+        
+        for patcher in (
+            mock.patch.object(monitor_control, "settings_store", store),
+            mock.patch.object(monitor_control, "submit_monitor_job", submit),
+            mock.patch.dict(monitor_control.g_monitors, monitors, clear=True),
+            mock.patch.dict(monitor_control.g_monitor_states, states, clear=True),
+            mock.patch.dict(monitor_control.animators, {}, clear=True),
+            mock.patch.dict(monitor_control.g_scene_errors, {}, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def writes(self, plan, monitor_key):
+        return [(feature.key, value) for feature, value in plan[monitor_key]]
+    
+    def test_specific_monitor_overrides_all(self):
+        plan = monitor_control.compile_scene({"2": {"brightness": 90}, "all": {"brightness": 30, "volume": 10}})
+        self.assertEqual(self.writes(plan, "monitor_0"), [("brightness", 30), ("volume", 10)])
+        self.assertEqual(self.writes(plan, "monitor_1"), [("brightness", 90), ("volume", 10)])
+        
+        plan = monitor_control.compile_scene({"SIM-A": {"volume": 0}, "all": {"volume": 10}, "SIM-X": {"volume": 5}})
+        self.assertEqual(self.writes(plan, "monitor_0"), [("volume", 0)])
+        self.assertEqual(self.writes(plan, "monitor_1"), [("volume", 10)])
+        
+    def test_input_switch_is_last(self):
+        plan = monitor_control.compile_scene({"all": {"input": "HDMI-1", "brightness": 50, "color_preset": "sRGB"}})
+        for monitor_key in ("monitor_0", "monitor_1"):
+            writes = self.writes(plan, monitor_key)
+            self.assertEqual(writes[-1], ("input", 17))
+            self.assertEqual(len(writes), 3)
+            
+    def test_relative_values(self):
+        plan = monitor_control.compile_scene({"1": {"brightness": "+10"}})
+        self.assertEqual(self.writes(plan, "monitor_0"), [("brightness", 60)])
+        
+        # До первого чтения относительное значение применить нельзя
+        monitor_control.g_monitor_states["monitor_0"].updated_at = 0.0
+        with self.assertRaises(ValueError):
+            monitor_control.compile_scene({"1": {"brightness": "+10"}})
+            
+    def test_bad_scenes_are_rejected(self):
+        bad_scenes = {
+            "Опечатка": {"all": {"brigthness": 50}},
+            "Не объект": {"all": 5},
+            "Пустая": {},
+            "Вход": {"all": {"input": "VGA-7"}},
+            "Уровень": {"all": {"brightness": "много"}},
+            "Пустое значение": {"1": {"volume": None}},
+        }
+        for name, scene in bad_scenes.items():
+            with self.subTest(name):
+                with self.assertRaises(ValueError):
+                    monitor_control.validate_scene(scene)
+        
+        monitor_control.settings_store.put(monitor_control.SCENES_KEY, dict(bad_scenes, Хорошая={"all": {"brightness": "+5"}}))
+        self.assertEqual(list(monitor_control.get_scenes()), ["Хорошая"])
+        with self.assertRaises(ValueError):
+            monitor_control.apply_scene("Опечатка")
+        self.assertEqual(self.vcps[0].transactions["set"], 0)
+        
+        # Сохранение новой сцены не удаляет из файла сцены с ошибками - их можно исправить вручную
+        monitor_control.save_scene("Текущая")
+        self.assertIn("Опечатка", monitor_control.settings_store.get(monitor_control.SCENES_KEY))
+        self.assertIn("Текущая", monitor_control.get_scenes())
+        
+    def test_only_fresh_shadow_skips_write(self):
+        monitor_control.settings_store.put(monitor_control.SCENES_KEY, {"День": {"1": {"brightness": 80}}})
+        vcp = self.vcps[0]
+        shadow = monitor_control.g_monitors["monitor_0"]["monitor"].shadow
+        
+        monitor_control.apply_scene("День")
+        self.assertEqual(vcp.values[monitor_sim.VCP_BRIGHTNESS], 80)
+        self.assertEqual(vcp.transactions["set"], 1)
+        
+        # Значение только что записано нами - повторная запись не нужна
+        monitor_control.apply_scene("День")
+        self.assertEqual(vcp.transactions["set"], 1)
+        
+        # Кнопками монитора яркость изменили, теневое значение устарело - сцена записывает снова
+        vcp.values[monitor_sim.VCP_BRIGHTNESS] = 30
+        value, recorded_at = shadow.values[monitor_sim.VCP_BRIGHTNESS]
+        shadow.values[monitor_sim.VCP_BRIGHTNESS] = (value, recorded_at - monitor_control.SHADOW_MAX_AGE_MS / 1000.0 - 1)
+        monitor_control.apply_scene("День")
+        self.assertEqual(vcp.transactions["set"], 2)
+        self.assertEqual(vcp.values[monitor_sim.VCP_BRIGHTNESS], 80)
+
+if __name__ == "__main__":
+    unittest.main()